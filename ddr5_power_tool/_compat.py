@@ -0,0 +1,38 @@
+"""
+Compatibility helpers across supported Python versions.
+"""
+
+import json
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# dataclass(slots=True) requires Python 3.10+; older versions keep a __dict__
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+def load_json(path: str):
+    """Read and parse a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def dump_json(data, path: str, indent: bool = False):
+    """Serialize data to a JSON file (two-space indent if requested), using orjson when installed."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None))
+        return
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2 if indent else None)
@@ -0,0 +1,88 @@
+"""
+JIT-compiled scalar timing constraint checks.
+
+Each check takes a bank's state code and times (ns) and returns an int
+result code; CHECK_OK means the command can be issued.
+"""
+
+from ddr5_power_tool._njit import njit
+
+
+# Bank state codes (BankState values)
+_IDLE = 0
+_ACTIVE = 1
+_REFRESHING = 4
+
+# Packed per-bank word: state code in the low STATE_BITS bits, open row above them
+STATE_BITS = 3
+STATE_MASK = (1 << STATE_BITS) - 1
+
+# Check result codes
+CHECK_OK = 0
+ERR_ALREADY_ACTIVE = 1
+ERR_REFRESHING = 2
+ERR_TRC = 3
+ERR_NOT_ACTIVE = 4
+ERR_TRCD = 5
+ERR_ALREADY_IDLE = 6
+ERR_TRAS = 7
+ERR_TWR = 8
+ERR_TREFI = 9
+ERR_NO_ROW = 10
+ERR_NO_BANK = 11
+
+
+@njit(cache=True)
+def check_activate(state, last_activate_time, current_time, trc):
+    """Check ACTIVATE: bank must be closed and tRC must have elapsed."""
+    if state == _ACTIVE:
+        return ERR_ALREADY_ACTIVE
+    if state == _REFRESHING:
+        return ERR_REFRESHING
+    if last_activate_time > 0 and current_time - last_activate_time < trc:
+        return ERR_TRC
+    return CHECK_OK
+
+
+@njit(cache=True)
+def check_column(state, last_activate_time, current_time, trcd):
+    """Check READ/WRITE: bank must be active and tRCD must have elapsed."""
+    if state != _ACTIVE:
+        return ERR_NOT_ACTIVE
+    if current_time - last_activate_time < trcd:
+        return ERR_TRCD
+    return CHECK_OK
+
+
+@njit(cache=True)
+def check_precharge(state, last_activate_time, last_write_time, current_time, tras, twr):
+    """Check PRECHARGE: bank must be open, with tRAS and tWR elapsed."""
+    if state == _IDLE:
+        return ERR_ALREADY_IDLE
+    if state == _REFRESHING:
+        return ERR_REFRESHING
+    if state == _ACTIVE and last_activate_time >= 0 and current_time - last_activate_time < tras:
+        return ERR_TRAS
+    if last_write_time > 0 and current_time - last_write_time < twr:
+        return ERR_TWR
+    return CHECK_OK
+
+
+@njit(cache=True)
+def check_precharge_no_write(state, last_activate_time, current_time, tras):
+    """Check PRECHARGE for a bank that has never been written (no tWR check)."""
+    if state == _IDLE:
+        return ERR_ALREADY_IDLE
+    if state == _REFRESHING:
+        return ERR_REFRESHING
+    if state == _ACTIVE and last_activate_time >= 0 and current_time - last_activate_time < tras:
+        return ERR_TRAS
+    return CHECK_OK
+
+
+@njit(cache=True)
+def check_refresh(current_time, last_refresh_time, trfi):
+    """Check REFRESH: tREFI must have elapsed since the last refresh."""
+    if current_time - last_refresh_time < trfi:
+        return ERR_TREFI
+    return CHECK_OK
@@ -0,0 +1,21 @@
+"""
+Optional Numba support for JIT-compiled simulation kernels.
+
+When Numba is not installed, njit is a no-op decorator and kernels run as
+plain Python.
+"""
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
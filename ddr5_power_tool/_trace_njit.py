@@ -0,0 +1,159 @@
+"""
+JIT-compiled execution of a whole command trace against the bank-state arrays.
+"""
+
+import numpy as np
+from ddr5_power_tool._njit import njit
+from ddr5_power_tool._constraints_njit import (
+    _IDLE, _ACTIVE, _REFRESHING, STATE_BITS, STATE_MASK, CHECK_OK, ERR_ALREADY_IDLE, ERR_REFRESHING, ERR_TRC, ERR_TRCD,
+    ERR_TRAS, ERR_TWR, ERR_TREFI, ERR_NO_ROW, ERR_NO_BANK,
+    check_activate, check_column, check_precharge, check_refresh,
+)
+from ddr5_power_tool.workload_parser import CommandType, CMD_CODE
+
+
+_ACT = CMD_CODE[CommandType.ACT]
+_RD = CMD_CODE[CommandType.RD]
+_WR = CMD_CODE[CommandType.WR]
+_PRE = CMD_CODE[CommandType.PRE]
+_PREA = CMD_CODE[CommandType.PREA]
+_REF = CMD_CODE[CommandType.REF]
+_REFPB = CMD_CODE[CommandType.REFPB]
+
+
+@njit(cache=True)
+def _error_value(result, current_time, last_activate_time, last_write_time, last_refresh_time):
+    """Elapsed time (ns) reported in the error message for a failed check."""
+    if result == ERR_TRC or result == ERR_TRCD or result == ERR_TRAS:
+        return current_time - last_activate_time
+    if result == ERR_TWR:
+        return current_time - last_write_time
+    if result == ERR_TREFI:
+        return current_time - last_refresh_time
+    return 0.0
+
+
+@njit(cache=True)
+def run_trace(codes, times_ns, ranks, banks, rows,
+              state_row, last_activate_time, last_precharge_time,
+              last_read_time, last_write_time,
+              n_banks, n_states, end_time_ns, last_refresh_time, trc, trcd, tras, twr, trfi):
+    """
+    Execute state-machine commands in order, updating the bank arrays in place.
+    state_row holds each bank's packed state code and open row (see STATE_BITS).
+    Missing banks and rows are -1; commands must exclude END_OF_SIMULATION,
+    PDN and SR.
+    
+    Returns (results, values, state_time_ns, last_refresh_time): a check result
+    code and error value (ns) per command, and the bank-time (bank count x ns)
+    spent in each state from time 0 to end_time_ns, for background power.
+    """
+    n = codes.shape[0]
+    results = np.zeros(n, dtype=np.int64)
+    values = np.zeros(n)
+    state_time_ns = np.zeros(n_states)
+    interval_start = 0.0
+    
+    counts = np.zeros(n_states, dtype=np.int64)
+    for idx in range(state_row.shape[0]):
+        counts[state_row[idx] & STATE_MASK] += 1
+    
+    for i in range(n):
+        code = codes[i]
+        now = times_ns[i]
+        
+        # Bank states only change on non-column commands; close the interval
+        if code != _RD and code != _WR:
+            dt = now - interval_start
+            if dt > 0:
+                for s in range(n_states):
+                    state_time_ns[s] += counts[s] * dt
+            interval_start = now
+        
+        bank = banks[i]
+        if code == _REF or code == _REFPB:
+            if code == _REFPB and bank < 0:
+                results[i] = ERR_NO_BANK
+                continue
+            result = check_refresh(now, last_refresh_time, trfi)
+            if result != CHECK_OK:
+                results[i] = result
+                values[i] = now - last_refresh_time
+                continue
+            # Active banks refresh and return to IDLE
+            for idx in range(state_row.shape[0]):
+                s = state_row[idx] & STATE_MASK
+                if s == _ACTIVE or s == _REFRESHING:
+                    counts[s] -= 1
+                    counts[_IDLE] += 1
+                    state_row[idx] = _IDLE
+            last_refresh_time = now
+            continue
+        
+        if code == _PREA:
+            # Every bank of the rank; the highest failing bank's error is reported
+            base = ranks[i] * n_banks
+            for b in range(n_banks):
+                idx = base + b
+                s = state_row[idx] & STATE_MASK
+                if s == _IDLE:
+                    results[i] = ERR_ALREADY_IDLE
+                    values[i] = 0.0
+                    continue
+                if s == _REFRESHING:
+                    results[i] = ERR_REFRESHING
+                    values[i] = 0.0
+                    continue
+                result = check_precharge(s, last_activate_time[idx], last_write_time[idx],
+                                         now, tras, twr)
+                if result != CHECK_OK:
+                    results[i] = result
+                    values[i] = _error_value(result, now, last_activate_time[idx],
+                                             last_write_time[idx], last_refresh_time)
+                    continue
+                counts[s] -= 1
+                counts[_IDLE] += 1
+                state_row[idx] = _IDLE
+                last_precharge_time[idx] = now
+            continue
+        
+        idx = ranks[i] * n_banks + max(bank, 0)
+        s = state_row[idx] & STATE_MASK
+        if code == _ACT:
+            if rows[i] < 0:
+                results[i] = ERR_NO_ROW
+                continue
+            result = check_activate(s, last_activate_time[idx], now, trc)
+        elif code == _PRE:
+            result = check_precharge(s, last_activate_time[idx], last_write_time[idx],
+                                     now, tras, twr)
+        else:
+            result = check_column(s, last_activate_time[idx], now, trcd)
+        
+        if result != CHECK_OK:
+            results[i] = result
+            values[i] = _error_value(result, now, last_activate_time[idx],
+                                     last_write_time[idx], last_refresh_time)
+            continue
+        
+        if code == _ACT:
+            counts[s] -= 1
+            counts[_ACTIVE] += 1
+            state_row[idx] = _ACTIVE | (np.int64(rows[i]) << STATE_BITS)
+            last_activate_time[idx] = now
+        elif code == _PRE:
+            counts[s] -= 1
+            counts[_IDLE] += 1
+            state_row[idx] = _IDLE
+            last_precharge_time[idx] = now
+        elif code == _RD:
+            last_read_time[idx] = now
+        else:
+            last_write_time[idx] = now
+    
+    dt = end_time_ns - interval_start
+    if dt > 0:
+        for s in range(n_states):
+            state_time_ns[s] += counts[s] * dt
+    
+    return results, values, state_time_ns, last_refresh_time
@@ -3,30 +3,32 @@ Command-line interface for DDR5/LPDDR5 power tool.
 """
 
 import argparse
-import json
 import sys
+from bisect import bisect_right
 from pathlib import Path
 from ddr5_power_tool.spec_parser import MemorySpec
 from ddr5_power_tool.workload_parser import Workload
 from ddr5_power_tool.simulator import Simulator
+from ddr5_power_tool._compat import dump_json
+
+
+# Display units: thresholds select (divisor, unit) via bisect
+_ENERGY_THRESHOLDS = (1e3, 1e6)
+_ENERGY_UNITS = ((1.0, "nJ"), (1e3, "µJ"), (1e6, "mJ"))
+_POWER_THRESHOLDS = (1000.0,)
+_POWER_UNITS = ((1.0, "mW"), (1000.0, "W"))
 
 
 def format_energy(energy_nj: float) -> str:
     """Format energy value."""
-    if energy_nj >= 1e6:
-        return f"{energy_nj / 1e6:.3f} mJ"
-    elif energy_nj >= 1e3:
-        return f"{energy_nj / 1e3:.3f} µJ"
-    else:
-        return f"{energy_nj:.3f} nJ"
+    divisor, unit = _ENERGY_UNITS[bisect_right(_ENERGY_THRESHOLDS, energy_nj)]
+    return f"{energy_nj / divisor:.3f} {unit}"
 
 
 def format_power(power_mw: float) -> str:
     """Format power value."""
-    if power_mw >= 1000:
-        return f"{power_mw / 1000:.3f} W"
-    else:
-        return f"{power_mw:.3f} mW"
+    divisor, unit = _POWER_UNITS[bisect_right(_POWER_THRESHOLDS, power_mw)]
+    return f"{power_mw / divisor:.3f} {unit}"
 
 
 def print_results(result, simulator: Simulator):
@@ -99,8 +101,7 @@ def export_json(result, output_path: str):
         }
     }
     
-    with open(output_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    dump_json(data, output_path, indent=True)
     
     print(f"\nResults exported to: {output_path}")
 
@@ -147,7 +148,7 @@ def main():
     
     # Load workload
     try:
-        workload = Workload.from_json(args.workload)
+        workload = Workload.from_json_arrays(args.workload)
     except Exception as e:
         print(f"Error loading workload: {e}", file=sys.stderr)
         sys.exit(1)
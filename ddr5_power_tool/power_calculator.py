@@ -4,12 +4,74 @@ Power calculation engine for DDR5/LPDDR5.
 
 from typing import Dict, List, Optional
 from dataclasses import dataclass, field
+import numpy as np
+from ddr5_power_tool._compat import DATACLASS_SLOTS
+from ddr5_power_tool._njit import njit, HAVE_NUMBA
 from ddr5_power_tool.spec_parser import MemorySpec
-from ddr5_power_tool.state_machine import DRAMStateMachine, BankState
-from ddr5_power_tool.workload_parser import CommandType
+from ddr5_power_tool.state_machine import DRAMStateMachine, BankState, N_BANK_STATES, STATE_MASK
+from ddr5_power_tool.workload_parser import CommandType, CMD_CODE, N_COMMAND_TYPES
 
 
-@dataclass
+# Slots of the energy breakdown accumulation buffer
+E_ACT, E_RD, E_WR, E_PRE, E_REF, E_BG_ACT, E_BG_PRE, E_PDN, E_TERM, E_DYN_IO = range(10)
+BREAKDOWN_COUNT = 10
+CORE_SLICE = slice(E_ACT, E_PDN + 1)
+INTERFACE_SLICE = slice(E_TERM, E_DYN_IO + 1)
+
+# PowerResult field for each breakdown slot
+BREAKDOWN_FIELDS = (
+    "activation_energy",
+    "read_energy",
+    "write_energy",
+    "precharge_energy",
+    "refresh_energy",
+    "background_active_energy",
+    "background_precharge_energy",
+    "powerdown_energy",
+    "termination_energy",
+    "dynamic_io_energy",
+)
+
+# Breakdown slot that each energy-consuming command contributes to
+_ENERGY_SLOTS: Dict[CommandType, int] = {
+    CommandType.ACT: E_ACT,
+    CommandType.RD: E_RD,
+    CommandType.WR: E_WR,
+    CommandType.PRE: E_PRE,
+    CommandType.PREA: E_PRE,
+    CommandType.REF: E_REF,
+    CommandType.REFPB: E_REF,
+}
+
+# Breakdown slot for every CMD_CODE; commands without energy (PDN, SR,
+# END_OF_SIMULATION) have all-zero coefficients and map to the power-down slot
+_SLOT_OF_CODE = np.array(
+    [_ENERGY_SLOTS.get(cmd_type, E_PDN) for cmd_type in CommandType], dtype=np.intp
+)
+
+_REFRESH_COMMANDS = frozenset({CommandType.REF, CommandType.REFPB})
+
+
+@njit(cache=True)
+def _command_sums_kernel(codes, durations_ns, burst_lengths, n_types):
+    """
+    Reduce a command batch to per-command-type sums in a single pass.
+    Returns (counts, duration_sums_ns, burst_sums) indexed by CMD_CODE.
+    """
+    counts = np.zeros(n_types)
+    duration_sums_ns = np.zeros(n_types)
+    burst_sums = np.zeros(n_types)
+    
+    for i in range(codes.shape[0]):
+        code = codes[i]
+        counts[code] += 1.0
+        duration_sums_ns[code] += durations_ns[i]
+        burst_sums[code] += burst_lengths[i]
+    
+    return counts, duration_sums_ns, burst_sums
+
+
+@dataclass(**DATACLASS_SLOTS)
 class PowerResult:
     """Power calculation result."""
     core_energy: float = 0.0  # nJ
@@ -32,13 +94,36 @@ class PowerResult:
 
 
 class PowerCalculator:
-    """Power calculation engine."""
+    """
+    Power calculation engine.
+    Energy coefficients are derived from the spec and I/O parameters up front;
+    setting an I/O parameter recomputes them, and refresh_coefficients() must be
+    called after editing the spec in place.
+    """
+    
+    __slots__ = (
+        "spec", "state_machine", "result", "_e",
+        "state_history", "last_state_time", "refresh_count", "last_refresh_time",
+        "_odt_resistance", "_dq_capacitance", "_switching_activity",
+        # Spec values snapshotted from the spec (see _cache_spec_values)
+        "_tck", "_bl", "_n_banks_total", "_state_row",
+        # Energy coefficients (see _cache_coefficients)
+        "_c_act", "_c_rd", "_c_wr", "_c_pre", "_c_ref",
+        "_c_act_stby", "_c_act_pdn", "_c_pre_stby", "_c_pre_pdn",
+        "_e_term_per_ns", "_e_io_per_bit_nj", "_io_bits_per_beat", "_e_io_per_txfer",
+        "_e_act_per_cmd", "_e_pre_per_cmd", "_e_ref_per_cmd", "_e_refpb_per_cmd",
+        # Per-command tables (see _build_command_tables)
+        "_fixed_energy", "_energy_per_ns", "_energy_per_beat", "_term_per_ns", "_dispatch",
+    )
     
     def __init__(self, spec: MemorySpec, state_machine: DRAMStateMachine):
         self.spec = spec
         self.state_machine = state_machine
         self.result = PowerResult()
         
+        # Energy breakdown accumulators (nJ), indexed by E_* slots
+        self._e = np.zeros(BREAKDOWN_COUNT)
+        
         # State tracking for background power
         self.state_history: List[Dict] = []  # List of (time, state) tuples
         self.last_state_time: float = 0.0
@@ -48,48 +133,146 @@ class PowerCalculator:
         self.last_refresh_time: float = -1e9
         
         # I/O power parameters
-        self.odt_resistance: float = 120.0  # Ohms (typical)
-        self.dq_capacitance: float = 2.0  # pF (typical)
-        self.switching_activity: float = 0.5  # 50% switching
+        self._odt_resistance: float = 120.0  # Ohms (typical)
+        self._dq_capacitance: float = 2.0  # pF (typical)
+        self._switching_activity: float = 0.5  # 50% switching
+        
+        self.refresh_coefficients()
+    
+    @property
+    def odt_resistance(self) -> float:
+        """ODT termination resistance (Ohms)."""
+        return self._odt_resistance
+    
+    @odt_resistance.setter
+    def odt_resistance(self, value: float):
+        self._odt_resistance = value
+        self.refresh_coefficients()
+    
+    @property
+    def dq_capacitance(self) -> float:
+        """DQ pin capacitance (pF)."""
+        return self._dq_capacitance
+    
+    @dq_capacitance.setter
+    def dq_capacitance(self, value: float):
+        self._dq_capacitance = value
+        self.refresh_coefficients()
+    
+    @property
+    def switching_activity(self) -> float:
+        """Fraction of DQ bits toggling per beat."""
+        return self._switching_activity
+    
+    @switching_activity.setter
+    def switching_activity(self, value: float):
+        self._switching_activity = value
+        self.refresh_coefficients()
+    
+    def refresh_coefficients(self):
+        """Recompute the cached spec values, energy coefficients and command tables."""
+        self._cache_spec_values()
+        self._cache_coefficients()
+        self._build_command_tables()
+    
+    def _cache_spec_values(self):
+        """Snapshot spec values read per command to avoid attribute chains."""
+        architecture = self.spec.architecture
+        self._tck = self.spec.timing.tck
+        self._bl = architecture.burst_length
+        self._n_banks_total = architecture.nbr_of_ranks * architecture.nbr_of_banks
+        self._state_row = self.state_machine.state_row
+    
+    def _cache_coefficients(self):
+        """
+        Precompute energy coefficients so each calculation is a single multiply.
+        Current coefficients are in nJ per ns: I (mA) * V_DD (V) / 1000.
+        """
+        power = self.spec.power
+        timing = self.spec.timing
+        vdd = power.vdd
+        vddq = power.vddq
+        
+        # Core currents above active standby (nJ/ns)
+        self._c_act = (power.idd0 - power.idd3n) * vdd / 1000.0
+        self._c_rd = (power.idd4r - power.idd3n) * vdd / 1000.0
+        self._c_wr = (power.idd4w - power.idd3n) * vdd / 1000.0
+        self._c_pre = (power.idd0 - power.idd3n) * vdd / 1000.0
+        self._c_ref = power.idd5b * vdd / 1000.0
+        
+        # Background and power-down currents (nJ/ns)
+        self._c_act_stby = power.idd3n * vdd / 1000.0
+        self._c_act_pdn = power.idd3p * vdd / 1000.0
+        self._c_pre_stby = power.idd2n * vdd / 1000.0
+        self._c_pre_pdn = power.idd2p * vdd / 1000.0
+        
+        # ODT termination to VDDQ/2 at 50% duty cycle (nJ/ns)
+        self._e_term_per_ns = (vddq / 2.0) ** 2 / self._odt_resistance * 0.5
+        
+        # Dynamic I/O: E = 0.5 * C * V^2 per transition (nJ per bit)
+        self._e_io_per_bit_nj = 0.5 * self._dq_capacitance * vddq ** 2 / 1000.0
+        self._io_bits_per_beat = self.spec.architecture.width * self._switching_activity
+        self._e_io_per_txfer = self._e_io_per_bit_nj * self._io_bits_per_beat  # nJ per beat
+        
+        # ACT/PRE/REF energies use fixed tRAS/tRP/tRFC durations (nJ per command)
+        self._e_act_per_cmd = self._c_act * timing.tras
+        self._e_pre_per_cmd = self._c_pre * timing.trp
+        self._e_ref_per_cmd = self._c_ref * timing.trfc
+        self._e_refpb_per_cmd = self._c_ref * (timing.trfcpb if timing.trfcpb else timing.trfc)
+    
+    def _build_command_tables(self):
+        """
+        Build per-command energy coefficient tables indexed by CMD_CODE.
+        Every command energy is linear in its duration and burst length:
+        E = fixed + per_ns * duration + per_beat * burst_length
+        """
+        self._fixed_energy = np.zeros(N_COMMAND_TYPES)  # nJ per command
+        self._energy_per_ns = np.zeros(N_COMMAND_TYPES)  # nJ per ns (core)
+        self._energy_per_beat = np.zeros(N_COMMAND_TYPES)  # nJ per burst beat (I/O)
+        self._term_per_ns = np.zeros(N_COMMAND_TYPES)  # nJ per ns (termination)
+        
+        self._fixed_energy[CMD_CODE[CommandType.ACT]] = self._e_act_per_cmd
+        self._fixed_energy[CMD_CODE[CommandType.PRE]] = self._e_pre_per_cmd
+        self._fixed_energy[CMD_CODE[CommandType.PREA]] = self._e_pre_per_cmd
+        self._fixed_energy[CMD_CODE[CommandType.REF]] = self._e_ref_per_cmd
+        self._fixed_energy[CMD_CODE[CommandType.REFPB]] = self._e_refpb_per_cmd
+        
+        for cmd_type, c_core in ((CommandType.RD, self._c_rd), (CommandType.WR, self._c_wr)):
+            code = CMD_CODE[cmd_type]
+            self._energy_per_ns[code] = c_core
+            self._energy_per_beat[code] = self._e_io_per_txfer
+            self._term_per_ns[code] = self._e_term_per_ns
+        
+        # Scalar lookup for process_command:
+        # (breakdown slot, fixed, core + termination per ns, per beat, termination per ns)
+        self._dispatch = {}
+        for cmd_type, slot in _ENERGY_SLOTS.items():
+            code = CMD_CODE[cmd_type]
+            self._dispatch[cmd_type] = (
+                slot,
+                float(self._fixed_energy[code]),
+                float(self._energy_per_ns[code] + self._term_per_ns[code]),
+                float(self._energy_per_beat[code]),
+                float(self._term_per_ns[code]),
+            )
     
     def calculate_activation_power(self, duration_ns: float) -> float:
         """
         Calculate activation power.
         P_ACT = (I_DD0 - I_DD3N) * V_DD
         """
-        idd0 = self.spec.power.idd0  # mA
-        idd3n = self.spec.power.idd3n  # mA
-        
-        # Account for timing: activation happens over tRAS portion of tRC
-        tras = self.spec.timing.tras
-        trc = self.spec.timing.trc
-        
-        # Average current during activation cycle
-        # I_ACT = I_DD0 * (tRAS/tRC) + I_DD3N * ((tRC-tRAS)/tRC) - I_DD3N
-        # Simplified: extra current during activation
-        idd_activation = idd0 - idd3n
-        
-        power_mw = idd_activation * self.spec.power.vdd  # mW
-        energy_nj = power_mw * duration_ns / 1000.0  # nJ (mW * ns / 1000 = nJ)
-        
-        return energy_nj
+        return self._c_act * duration_ns  # nJ (mW * ns / 1000 = nJ)
     
     def calculate_read_power(self, duration_ns: float, burst_length: Optional[int] = None) -> float:
         """
         Calculate read power.
         P_RD = (I_DD4R - I_DD3N) * V_DD
         """
-        idd4r = self.spec.power.idd4r  # mA
-        idd3n = self.spec.power.idd3n  # mA
-        
-        idd_read = idd4r - idd3n
-        power_mw = idd_read * self.spec.power.vdd  # mW
-        energy_nj = power_mw * duration_ns / 1000.0  # nJ
+        energy_nj = self._c_rd * duration_ns  # nJ
         
         # Add I/O power for read
         if burst_length:
-            io_energy = self.calculate_io_power_read(burst_length, duration_ns)
-            energy_nj += io_energy
+            energy_nj += self._e_io_per_txfer * burst_length
         
         return energy_nj
     
@@ -98,17 +281,11 @@ class PowerCalculator:
         Calculate write power.
         P_WR = (I_DD4W - I_DD3N) * V_DD
         """
-        idd4w = self.spec.power.idd4w  # mA
-        idd3n = self.spec.power.idd3n  # mA
-        
-        idd_write = idd4w - idd3n
-        power_mw = idd_write * self.spec.power.vdd  # mW
-        energy_nj = power_mw * duration_ns / 1000.0  # nJ
+        energy_nj = self._c_wr * duration_ns  # nJ
         
-        # Add I/O power for write
+        # Add I/O power for write (same switching model as read)
         if burst_length:
-            io_energy = self.calculate_io_power_write(burst_length, duration_ns)
-            energy_nj += io_energy
+            energy_nj += self._e_io_per_txfer * burst_length
         
         return energy_nj
     
@@ -117,25 +294,14 @@ class PowerCalculator:
         Calculate precharge power.
         Similar to activation, accounts for precharge cycle.
         """
-        idd0 = self.spec.power.idd0  # mA
-        idd3n = self.spec.power.idd3n  # mA
-        
-        idd_precharge = idd0 - idd3n
-        power_mw = idd_precharge * self.spec.power.vdd  # mW
-        energy_nj = power_mw * duration_ns / 1000.0  # nJ
-        
-        return energy_nj
+        return self._c_pre * duration_ns  # nJ
     
     def calculate_refresh_power(self, duration_ns: float) -> float:
         """
         Calculate refresh power.
         P_REF = I_DD5B * V_DD
         """
-        idd5b = self.spec.power.idd5b  # mA
-        power_mw = idd5b * self.spec.power.vdd  # mW
-        energy_nj = power_mw * duration_ns / 1000.0  # nJ
-        
-        return energy_nj
+        return self._c_ref * duration_ns  # nJ
     
     def calculate_background_power(self, active_stby_time_ns: float, active_pdn_time_ns: float,
                                    precharge_stby_time_ns: float, precharge_pdn_time_ns: float) -> tuple[float, float]:
@@ -151,31 +317,13 @@ class PowerCalculator:
         
         Returns (active_energy, precharge_energy) in nJ
         """
-        # Active standby power (ACT_STBY)
-        idd3n = self.spec.power.idd3n  # mA
-        power_active_stby_mw = idd3n * self.spec.power.vdd  # mW
-        energy_active_stby_nj = power_active_stby_mw * active_stby_time_ns / 1000.0  # nJ
-        
-        # Active power-down power (ACT_PDN)
-        idd3p = self.spec.power.idd3p  # mA
-        power_active_pdn_mw = idd3p * self.spec.power.vdd  # mW
-        energy_active_pdn_nj = power_active_pdn_mw * active_pdn_time_ns / 1000.0  # nJ
-        
-        # Precharge standby power (PRE_STBY)
-        idd2n = self.spec.power.idd2n  # mA
-        power_precharge_stby_mw = idd2n * self.spec.power.vdd  # mW
-        energy_precharge_stby_nj = power_precharge_stby_mw * precharge_stby_time_ns / 1000.0  # nJ
-        
-        # Precharge power-down power (PRE_PDN)
-        idd2p = self.spec.power.idd2p  # mA
-        power_precharge_pdn_mw = idd2p * self.spec.power.vdd  # mW
-        energy_precharge_pdn_nj = power_precharge_pdn_mw * precharge_pdn_time_ns / 1000.0  # nJ
-        
         # Total active energy (standby + power-down)
-        active_energy_nj = energy_active_stby_nj + energy_active_pdn_nj
+        active_energy_nj = (self._c_act_stby * active_stby_time_ns +
+                            self._c_act_pdn * active_pdn_time_ns)
         
         # Total precharge energy (standby + power-down)
-        precharge_energy_nj = energy_precharge_stby_nj + energy_precharge_pdn_nj
+        precharge_energy_nj = (self._c_pre_stby * precharge_stby_time_ns +
+                               self._c_pre_pdn * precharge_pdn_time_ns)
         
         return active_energy_nj, precharge_energy_nj
     
@@ -186,69 +334,26 @@ class PowerCalculator:
         P_PPD = I_DD2P * V_DD (precharge power-down)
         """
         if is_active_pdn:
-            idd = self.spec.power.idd3p  # mA
-        else:
-            idd = self.spec.power.idd2p  # mA
-        
-        power_mw = idd * self.spec.power.vdd  # mW
-        energy_nj = power_mw * duration_ns / 1000.0  # nJ
-        
-        return energy_nj
+            return self._c_act_pdn * duration_ns  # nJ
+        return self._c_pre_pdn * duration_ns  # nJ
     
     def calculate_termination_power(self, duration_ns: float, is_read: bool = True) -> float:
         """
         Calculate ODT termination power.
         P_term = V_term^2 / R_term * (fraction of time active)
-        """
-        # For DDR5: termination to VDDQ/2
-        # For LPDDR5: termination to GND (lower power)
-        vddq = self.spec.power.vddq
-        
-        # Assume DDR5-style termination (can be adjusted for LPDDR5)
-        v_term = vddq / 2.0  # V
-        r_term = self.odt_resistance  # Ohms
-        
-        # Power in mW
-        power_mw = (v_term ** 2 / r_term) * 1000.0  # mW
-        
-        # Only active during read/write operations
-        # Assume 50% duty cycle during data transfer
-        duty_cycle = 0.5 if is_read else 0.5
-        energy_nj = power_mw * duration_ns * duty_cycle / 1000.0  # nJ
         
-        return energy_nj
+        Assumes DDR5-style termination to VDDQ/2 with a 50% duty cycle
+        during data transfer (LPDDR5 terminates to GND at lower power).
+        """
+        return self._e_term_per_ns * duration_ns  # nJ
     
     def calculate_io_power_read(self, burst_length: int, duration_ns: float) -> float:
         """
         Calculate dynamic I/O power for read operations.
         P_DQ = C_DQ * V_swing * f * switching_activity
         """
-        vddq = self.spec.power.vddq
-        v_swing = vddq  # Full swing
-        c_dq = self.dq_capacitance  # pF
-        n_dq_pins = self.spec.architecture.width  # number of data pins
-        
-        # Frequency in GHz
-        tck_ns = self.spec.timing.tck
-        freq_ghz = 1.0 / (tck_ns * 2.0)  # DDR: 2 transfers per cycle
-        
-        # Energy per transition: E = 0.5 * C * V^2
-        energy_per_transition_pj = 0.5 * c_dq * (v_swing ** 2)  # pJ
-        
         # Total transitions: burst_length * n_dq_pins * switching_activity
-        n_transitions = burst_length * n_dq_pins * self.switching_activity
-        
-        # Total energy in nJ
-        energy_nj = energy_per_transition_pj * n_transitions / 1000.0  # nJ
-        
-        return energy_nj
-    
-    def calculate_io_power_write(self, burst_length: int, duration_ns: float) -> float:
-        """
-        Calculate dynamic I/O power for write operations.
-        Similar to read, but may have different switching characteristics.
-        """
-        return self.calculate_io_power_read(burst_length, duration_ns)
+        return self._e_io_per_txfer * burst_length  # nJ
     
     def process_command(self, cmd_type: CommandType, rank: int, bank: int, 
                        current_time_ns: float, next_time_ns: Optional[float] = None,
@@ -257,57 +362,67 @@ class PowerCalculator:
         """
         Process a single command and return energy consumed.
         """
-        duration_ns = (next_time_ns - current_time_ns) if next_time_ns else self.spec.timing.tck
-        
-        energy_nj = 0.0
-        
-        if cmd_type == CommandType.ACT:
-            # Activation energy
-            act_energy = self.calculate_activation_power(self.spec.timing.tras)
-            energy_nj += act_energy
-            self.result.activation_energy += act_energy
-            
-        elif cmd_type == CommandType.RD:
-            # Read energy
-            bl = burst_length or self.spec.architecture.burst_length
-            rd_energy = self.calculate_read_power(duration_ns, bl)
-            energy_nj += rd_energy
-            self.result.read_energy += rd_energy
-            
-            # Termination power
-            term_energy = self.calculate_termination_power(duration_ns, is_read=True)
-            energy_nj += term_energy
-            self.result.termination_energy += term_energy
-            
-        elif cmd_type == CommandType.WR:
-            # Write energy
-            bl = burst_length or self.spec.architecture.burst_length
-            wr_energy = self.calculate_write_power(duration_ns, bl)
-            energy_nj += wr_energy
-            self.result.write_energy += wr_energy
-            
-            # Termination power
-            term_energy = self.calculate_termination_power(duration_ns, is_read=False)
-            energy_nj += term_energy
-            self.result.termination_energy += term_energy
-            
-        elif cmd_type == CommandType.PRE or cmd_type == CommandType.PREA:
-            # Precharge energy
-            pre_energy = self.calculate_precharge_power(self.spec.timing.trp)
-            energy_nj += pre_energy
-            self.result.precharge_energy += pre_energy
-            
-        elif cmd_type == CommandType.REF or cmd_type == CommandType.REFPB:
-            # Refresh energy
-            trfc = self.spec.timing.trfcpb if (cmd_type == CommandType.REFPB and self.spec.timing.trfcpb) else self.spec.timing.trfc
-            ref_energy = self.calculate_refresh_power(trfc)
-            energy_nj += ref_energy
-            self.result.refresh_energy += ref_energy
+        duration_ns = (next_time_ns - current_time_ns) if next_time_ns else self._tck
+        
+        entry = self._dispatch.get(cmd_type)
+        if entry is None:
+            return 0.0
+        
+        slot, fixed, fused_per_ns, per_beat, term_per_ns = entry
+        bl = burst_length or self._bl
+        
+        # Core, I/O and termination energy in one multiply-add
+        energy_nj = fixed + fused_per_ns * duration_ns + per_beat * bl
+        
+        # Termination power (RD/WR only) is reported separately
+        term_energy = term_per_ns * duration_ns
+        self._e[slot] += energy_nj - term_energy
+        self._e[E_TERM] += term_energy
+        
+        if cmd_type in _REFRESH_COMMANDS:
             self.refresh_count += 1
             self.last_refresh_time = current_time_ns
         
         return energy_nj
     
+    def process_commands(self, codes: np.ndarray, times_ns: np.ndarray,
+                         durations_ns: np.ndarray, burst_lengths: np.ndarray) -> float:
+        """
+        Process a batch of executed commands and return total energy consumed.
+        Vectorized equivalent of calling process_command once per command;
+        codes are CMD_CODE values and burst lengths must already be defaulted.
+        """
+        if len(codes) == 0:
+            return 0.0
+        
+        # One pass over the batch; energies are then linear in the per-type sums
+        if HAVE_NUMBA:
+            counts, duration_sums_ns, burst_sums = _command_sums_kernel(
+                codes, durations_ns, burst_lengths, N_COMMAND_TYPES
+            )
+        else:
+            counts = np.bincount(codes, minlength=N_COMMAND_TYPES)
+            duration_sums_ns = np.bincount(codes, weights=durations_ns, minlength=N_COMMAND_TYPES)
+            burst_sums = np.bincount(codes, weights=burst_lengths, minlength=N_COMMAND_TYPES)
+        
+        by_code = (self._fixed_energy * counts +
+                   self._energy_per_ns * duration_sums_ns +
+                   self._energy_per_beat * burst_sums)
+        term_by_code = self._term_per_ns * duration_sums_ns
+        
+        # Scatter the per-command-type totals into their breakdown slots
+        np.add.at(self._e, _SLOT_OF_CODE, by_code)
+        self._e[E_TERM] += term_by_code.sum()
+        
+        # Refresh tracking
+        is_refresh = np.isin(codes, [CMD_CODE[c] for c in _REFRESH_COMMANDS])
+        refresh_idx = np.flatnonzero(is_refresh)
+        if len(refresh_idx):
+            self.refresh_count += len(refresh_idx)
+            self.last_refresh_time = float(times_ns[refresh_idx[-1]])
+        
+        return float(by_code.sum() + term_by_code.sum())
+    
     def accumulate_background_power(self, start_time_ns: float, end_time_ns: float):
         """
         Accumulate background power between commands.
@@ -317,25 +432,14 @@ class PowerCalculator:
         if duration_ns <= 0:
             return
         
-        from ddr5_power_tool.state_machine import BankState
-        
         # Count banks in each state
-        n_active_stby = 0  # ACTIVE (standby, CKE high)
-        n_active_pdn = 0   # ACTIVE_PDN (power-down, CKE low)
-        n_precharge_stby = 0  # IDLE (standby, CKE high)
-        n_precharge_pdn = 0   # PRE_PDN (power-down, CKE low)
-        
-        n_total = self.spec.architecture.nbr_of_ranks * self.spec.architecture.nbr_of_banks
-        
-        for (rank, bank), bank_info in self.state_machine.banks.items():
-            if bank_info.state == BankState.ACTIVE:
-                n_active_stby += 1
-            elif bank_info.state == BankState.ACTIVE_PDN:
-                n_active_pdn += 1
-            elif bank_info.state == BankState.IDLE:
-                n_precharge_stby += 1
-            elif bank_info.state == BankState.PRE_PDN:
-                n_precharge_pdn += 1
+        counts = np.bincount(self._state_row & STATE_MASK, minlength=N_BANK_STATES)
+        n_active_stby = int(counts[BankState.ACTIVE])  # ACTIVE (standby, CKE high)
+        n_active_pdn = int(counts[BankState.ACTIVE_PDN])  # ACTIVE_PDN (power-down, CKE low)
+        n_precharge_stby = int(counts[BankState.IDLE])  # IDLE (standby, CKE high)
+        n_precharge_pdn = int(counts[BankState.PRE_PDN])  # PRE_PDN (power-down, CKE low)
+        
+        n_total = self._n_banks_total
         
         # Calculate time-weighted background power
         # Assume uniform distribution across banks
@@ -355,39 +459,54 @@ class PowerCalculator:
             precharge_stby_time, precharge_pdn_time
         )
         
-        self.result.background_active_energy += bg_active
-        self.result.background_precharge_energy += bg_precharge
+        self._e[E_BG_ACT] += bg_active
+        self._e[E_BG_PRE] += bg_precharge
     
-    def finalize(self, simulation_time_ns: float):
+    def accumulate_background_state_times(self, state_time_ns: np.ndarray, duration_ns: float):
+        """
+        Accumulate background power over duration_ns from total bank-time per state.
+        state_time_ns[state] is the sum over banks of the time (ns) spent in
+        that state (indexed by BankState).
+        """
+        n_total = self._n_banks_total
+        if n_total > 0:
+            # Assume uniform distribution across banks
+            bg_active, bg_precharge = self.calculate_background_power(
+                state_time_ns[BankState.ACTIVE] / n_total,
+                state_time_ns[BankState.ACTIVE_PDN] / n_total,
+                state_time_ns[BankState.IDLE] / n_total,
+                state_time_ns[BankState.PRE_PDN] / n_total
+            )
+        else:
+            bg_active, bg_precharge = self.calculate_background_power(
+                0.0, 0.0, max(duration_ns, 0.0), 0.0
+            )
+        
+        self._e[E_BG_ACT] += bg_active
+        self._e[E_BG_PRE] += bg_precharge
+    
+    def finalize(self, simulation_time_ns: float) -> PowerResult:
         """
         Finalize power calculations and compute totals.
+        Copies the accumulated breakdown into the result once.
         """
-        self.result.simulation_time = simulation_time_ns
-        
-        # Sum core energy
-        self.result.core_energy = (
-            self.result.activation_energy +
-            self.result.read_energy +
-            self.result.write_energy +
-            self.result.precharge_energy +
-            self.result.refresh_energy +
-            self.result.background_active_energy +
-            self.result.background_precharge_energy +
-            self.result.powerdown_energy
-        )
+        result = self.result
+        result.simulation_time = simulation_time_ns
         
-        # Sum interface energy
-        self.result.interface_energy = (
-            self.result.termination_energy +
-            self.result.dynamic_io_energy
-        )
+        for field_name, energy_nj in zip(BREAKDOWN_FIELDS, self._e.tolist()):
+            setattr(result, field_name, energy_nj)
+        
+        # Sum core and interface energy
+        result.core_energy = float(self._e[CORE_SLICE].sum())
+        result.interface_energy = float(self._e[INTERFACE_SLICE].sum())
         
         # Total energy
-        self.result.total_energy = self.result.core_energy + self.result.interface_energy
+        result.total_energy = result.core_energy + result.interface_energy
         
         # Average power in mW
         if simulation_time_ns > 0:
-            self.result.average_power = (self.result.total_energy / simulation_time_ns) * 1000.0  # mW
+            result.average_power = (result.total_energy / simulation_time_ns) * 1000.0  # mW
         else:
-            self.result.average_power = 0.0
-
+            result.average_power = 0.0
+        
+        return result
@@ -2,133 +2,250 @@
 Main simulation engine for DDR5/LPDDR5 power estimation.
 """
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Union
+import numpy as np
 from ddr5_power_tool.spec_parser import MemorySpec
-from ddr5_power_tool.workload_parser import Workload, Command, CommandType
+from ddr5_power_tool.workload_parser import Workload, WorkloadArrays, CommandType, CMD_CODE, CMD_TYPES
+from ddr5_power_tool._njit import HAVE_NUMBA
 from ddr5_power_tool.state_machine import DRAMStateMachine
 from ddr5_power_tool.power_calculator import PowerCalculator, PowerResult
 
 
+# Integer command codes compared in the per-command loop
+_ACT = CMD_CODE[CommandType.ACT]
+_RD = CMD_CODE[CommandType.RD]
+_WR = CMD_CODE[CommandType.WR]
+_PRE = CMD_CODE[CommandType.PRE]
+_PREA = CMD_CODE[CommandType.PREA]
+_REF = CMD_CODE[CommandType.REF]
+_REFPB = CMD_CODE[CommandType.REFPB]
+_END = CMD_CODE[CommandType.END_OF_SIMULATION]
+
+# Commands that do not touch the state machine
+_STATELESS_CODES = (CMD_CODE[CommandType.PDN], CMD_CODE[CommandType.SR])
+
+# Commands addressing a single bank (ACT too, once it has a row)
+_BANK_CODES = (_RD, _WR, _PRE)
+
+# Commands that can change bank states (and so the background power level)
+_STATE_CHANGING_CODES = frozenset({_ACT, _PRE, _PREA, _REF, _REFPB})
+
+
+def _or_zero(values):
+    """Replace the -1 "missing" marker with 0, the default rank and bank."""
+    return np.where(values == -1, 0, values)
+
+
 class Simulator:
     """Main simulation engine."""
     
-    def __init__(self, spec: MemorySpec):
+    def __init__(self, spec: MemorySpec, use_jit: Optional[bool] = None):
+        """
+        use_jit selects the JIT-compiled trace kernel over the per-command loop;
+        by default it is used whenever Numba is installed.
+        """
         self.spec = spec
+        self.use_jit = HAVE_NUMBA if use_jit is None else use_jit
         self.state_machine = DRAMStateMachine(spec)
         self.power_calculator = PowerCalculator(spec, self.state_machine)
         self.errors: List[str] = []
         self.warnings: List[str] = []
+        self._handlers = self._build_handlers()
     
-    def simulate(self, workload: Workload) -> PowerResult:
+    def simulate(self, workload: Union[Workload, WorkloadArrays]) -> PowerResult:
         """
-        Run power simulation on workload.
+        Run power simulation on workload (as commands or struct-of-arrays columns).
         """
         self.errors.clear()
         self.warnings.clear()
         
-        commands = workload.commands
-        if not commands:
+        # Command fields as contiguous arrays, sorted by timestamp
+        columns = workload if isinstance(workload, WorkloadArrays) else workload.to_arrays()
+        n_commands = len(columns)
+        
+        if n_commands == 0:
             self.errors.append("No commands in workload")
             return self.power_calculator.result
         
-        # Sort commands by timestamp
-        sorted_commands = sorted(commands, key=lambda c: c.timestamp)
-        
         # Convert timestamps from clock cycles to nanoseconds
         tck_ns = self.spec.timing.tck
+        times_ns = columns.timestamp * tck_ns
         
-        last_time_ns = 0.0
+        # Command columns for the vectorized energy calculation
+        codes = columns.code.astype(np.intp)
+        default_bl = self.spec.architecture.burst_length
+        burst_lengths = np.where(columns.burst_length > 0,
+                                 columns.burst_length, default_bl).astype(np.float64)
         
-        for i, cmd in enumerate(sorted_commands):
-            if cmd.command == CommandType.END_OF_SIMULATION:
-                # Finalize background power accumulation
-                current_time_ns = cmd.timestamp * tck_ns
-                self.power_calculator.accumulate_background_power(last_time_ns, current_time_ns)
-                last_time_ns = current_time_ns
-                break
-            
-            current_time_ns = cmd.timestamp * tck_ns
-            next_time_ns = sorted_commands[i + 1].timestamp * tck_ns if i + 1 < len(sorted_commands) else current_time_ns + tck_ns
+        # Each command lasts until the next one (one tCK for the last command)
+        next_times_ns = np.append(times_ns[1:], times_ns[-1] + tck_ns)
+        durations_ns = np.where(next_times_ns != 0.0, next_times_ns - times_ns, tck_ns)
+        
+        # Commands after END_OF_SIMULATION are ignored; power-down and self-refresh
+        # entries never touch the state machine, so they are always executed
+        end_idx = np.flatnonzero(codes == _END)
+        n_active = int(end_idx[0]) if len(end_idx) else n_commands
+        last_time_ns = float(times_ns[min(n_active, n_commands - 1)])
+        
+        executed = np.zeros(n_commands, dtype=bool)
+        executed[:n_active] = np.isin(codes[:n_active], _STATELESS_CODES)
+        stateful_idx = np.flatnonzero(~executed[:n_active])
+        
+        # Step the state machine; energy is computed afterwards in one batch
+        self.state_machine.set_read_only(not np.any(codes[stateful_idx] == _WR))
+        if self.use_jit:
+            self._run_trace(columns, stateful_idx, times_ns, codes, executed, last_time_ns)
+        else:
+            self._step_commands(columns, stateful_idx, times_ns, codes, executed, last_time_ns)
+        
+        # Calculate power for all successfully executed commands
+        self.power_calculator.process_commands(
+            codes[executed],
+            times_ns[executed],
+            durations_ns[executed],
+            burst_lengths[executed]
+        )
+        
+        # Finalize calculations
+        final_time_ns = last_time_ns if last_time_ns > 0 else float(times_ns[-1])
+        self.power_calculator.finalize(final_time_ns)
+        
+        return self.power_calculator.result
+    
+    def _run_trace(self, columns: WorkloadArrays, stateful_idx: np.ndarray,
+                   times_ns: np.ndarray, codes: np.ndarray, executed: np.ndarray,
+                   last_time_ns: float):
+        """
+        Execute the state-machine commands in one JIT-compiled trace kernel,
+        marking successful ones in executed and accumulating background power.
+        """
+        trace_codes = codes[stateful_idx]
+        ranks = columns.rank[stateful_idx]
+        banks = columns.bank[stateful_idx]
+        rows = columns.row[stateful_idx]
+        self._check_banks(trace_codes, ranks, banks, rows)
+        ranks = _or_zero(ranks)
+        
+        results, values, state_time_ns = self.state_machine.run_trace(
+            trace_codes, times_ns[stateful_idx], ranks, banks, rows, last_time_ns,
+        )
+        executed[stateful_idx[results == 0]] = True
+        
+        # Background power, accumulated by the kernel up to the end of simulation
+        self.power_calculator.accumulate_background_state_times(state_time_ns, last_time_ns)
+        
+        timestamps = columns.timestamp.tolist()
+        constraints = self.state_machine.constraints
+        for j in np.flatnonzero(results).tolist():
+            code = int(trace_codes[j])
+            error = constraints.error_message(int(results[j]), float(values[j]),
+                                              "write" if code == _WR else "read")
+            self.errors.append(
+                f"Command {CMD_TYPES[code].value} at {timestamps[stateful_idx[j]]} cycles: {error}"
+            )
+    
+    def _check_banks(self, codes: np.ndarray, ranks: np.ndarray, banks: np.ndarray,
+                     rows: np.ndarray):
+        """
+        Raise KeyError for the first command addressing a rank or bank outside
+        the spec, as the per-command state machine does, before the trace kernel
+        indexes the bank arrays with it. PRECHARGE ALL reports bank 0, the first
+        bank it looks up.
+        """
+        arch = self.spec.architecture
+        uses_bank = np.isin(codes, _BANK_CODES) | ((codes == _ACT) & (rows >= 0))
+        uses_rank = uses_bank | (codes == _PREA)
+        ranks = _or_zero(ranks)
+        banks = np.where(uses_bank, _or_zero(banks), 0)
+        bad = ((uses_rank & ((ranks < 0) | (ranks >= arch.nbr_of_ranks)))
+               | (uses_bank & ((banks < 0) | (banks >= arch.nbr_of_banks))))
+        if bad.any():
+            j = int(np.argmax(bad))
+            raise KeyError((int(ranks[j]), int(banks[j])))
+    
+    def _step_commands(self, columns: WorkloadArrays, stateful_idx: np.ndarray,
+                       times_ns: np.ndarray, codes: np.ndarray, executed: np.ndarray,
+                       last_time_ns: float):
+        """
+        Execute the state-machine commands one at a time (used without Numba),
+        marking successful ones in executed and accumulating background power.
+        """
+        times = times_ns.tolist()
+        timestamps = columns.timestamp.tolist()
+        cmd_codes = codes.tolist()
+        ranks = _or_zero(columns.rank).tolist()
+        banks = columns.bank.tolist()
+        rows = columns.row.tolist()
+        handlers = self._handlers
+        
+        # Background power is linear in time, so it is only accumulated when the
+        # bank-state distribution may change, covering all time since the last change
+        bg_start_ns = 0.0
+        
+        for i in stateful_idx.tolist():
+            code = cmd_codes[i]
+            current_time_ns = times[i]
             
-            # Accumulate background power since last command
-            if current_time_ns > last_time_ns:
-                self.power_calculator.accumulate_background_power(last_time_ns, current_time_ns)
+            if code in _STATE_CHANGING_CODES:
+                self.power_calculator.accumulate_background_power(bg_start_ns, current_time_ns)
+                bg_start_ns = current_time_ns
             
             # Update state machine time
             self.state_machine.update_time(current_time_ns)
             
-            # Execute command in state machine
-            rank = cmd.rank if cmd.rank is not None else 0
-            bank = cmd.bank if cmd.bank is not None else 0
-            
-            success, error = self._execute_command(cmd, rank, bank)
+            # Execute command in state machine (-1 marks a missing bank or row)
+            success, error = handlers[code](ranks[i], banks[i], rows[i])
             
             if not success:
-                self.errors.append(f"Command {cmd.command.value} at {cmd.timestamp} cycles: {error}")
-                last_time_ns = current_time_ns
-                continue
-            
-            # Calculate power for this command
-            energy = self.power_calculator.process_command(
-                cmd.command,
-                rank,
-                bank,
-                current_time_ns,
-                next_time_ns,
-                cmd.row,
-                cmd.column,
-                cmd.burst_length
-            )
-            
-            self.power_calculator.result.core_energy += energy
-            
-            last_time_ns = current_time_ns
-        
-        # Finalize calculations
-        final_time_ns = last_time_ns if last_time_ns > 0 else sorted_commands[-1].timestamp * tck_ns
-        self.power_calculator.finalize(final_time_ns)
+                self.errors.append(f"Command {CMD_TYPES[code].value} at "
+                                   f"{timestamps[i]} cycles: {error}")
+            else:
+                executed[i] = True
         
-        return self.power_calculator.result
+        # Background power up to the end of simulation
+        self.power_calculator.accumulate_background_power(bg_start_ns, last_time_ns)
     
-    def _execute_command(self, cmd: Command, rank: int, bank: int) -> tuple[bool, Optional[str]]:
-        """Execute command in state machine."""
-        if cmd.command == CommandType.ACT:
-            if cmd.row is None:
-                return False, "ACT command requires row"
-            return self.state_machine.execute_activate(rank, bank, cmd.row)
-        
-        elif cmd.command == CommandType.RD:
-            return self.state_machine.execute_read(rank, bank)
-        
-        elif cmd.command == CommandType.WR:
-            return self.state_machine.execute_write(rank, bank)
-        
-        elif cmd.command == CommandType.PRE:
-            return self.state_machine.execute_precharge(rank, bank)
-        
-        elif cmd.command == CommandType.PREA:
-            # Precharge all banks
-            success = True
-            error_msg = None
-            for b in range(self.spec.architecture.nbr_of_banks):
-                s, e = self.state_machine.execute_precharge(rank, b)
-                if not s:
-                    success = False
-                    error_msg = e
-            return success, error_msg
-        
-        elif cmd.command == CommandType.REF:
-            return self.state_machine.execute_refresh()
-        
-        elif cmd.command == CommandType.REFPB:
-            # Per-bank refresh (LPDDR5)
-            if cmd.bank is None:
-                return False, "REFPB command requires bank"
-            # For now, treat as regular refresh (simplified)
-            return self.state_machine.execute_refresh()
-        
-        else:
-            return True, None  # Other commands don't need state machine updates
+    def _build_handlers(self) -> List:
+        """
+        Build the per-command handler table, indexed by CMD_CODE.
+        Every handler takes (rank, bank, row) with -1 for a missing bank or row.
+        """
+        handlers = [None] * len(CMD_TYPES)
+        handlers[_ACT] = self._execute_activate
+        handlers[_RD] = self._execute_read
+        handlers[_WR] = self._execute_write
+        handlers[_PRE] = self._execute_precharge
+        handlers[_PREA] = self._execute_precharge_all
+        handlers[_REF] = self._execute_refresh
+        handlers[_REFPB] = self._execute_refresh_per_bank
+        return handlers
+    
+    def _execute_activate(self, rank: int, bank: int, row: int) -> tuple[bool, Optional[str]]:
+        if row < 0:
+            return False, "ACT command requires row"
+        return self.state_machine.execute_activate(rank, 0 if bank == -1 else bank, row)
+    
+    def _execute_read(self, rank: int, bank: int, row: int) -> tuple[bool, Optional[str]]:
+        return self.state_machine.execute_read(rank, 0 if bank == -1 else bank)
+    
+    def _execute_write(self, rank: int, bank: int, row: int) -> tuple[bool, Optional[str]]:
+        return self.state_machine.execute_write(rank, 0 if bank == -1 else bank)
+    
+    def _execute_precharge(self, rank: int, bank: int, row: int) -> tuple[bool, Optional[str]]:
+        return self.state_machine.execute_precharge(rank, 0 if bank == -1 else bank)
+    
+    def _execute_precharge_all(self, rank: int, bank: int, row: int) -> tuple[bool, Optional[str]]:
+        return self.state_machine.execute_precharge_all(rank)
+    
+    def _execute_refresh(self, rank: int, bank: int, row: int) -> tuple[bool, Optional[str]]:
+        return self.state_machine.execute_refresh()
+    
+    def _execute_refresh_per_bank(self, rank: int, bank: int, row: int) -> tuple[bool, Optional[str]]:
+        # Per-bank refresh (LPDDR5)
+        if bank < 0:
+            return False, "REFPB command requires bank"
+        # For now, treat as regular refresh (simplified)
+        return self.state_machine.execute_refresh()
     
     def get_errors(self) -> List[str]:
         """Get list of errors encountered during simulation."""
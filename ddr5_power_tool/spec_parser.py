@@ -2,12 +2,14 @@
 JSON specification parser for memory power and timing specifications.
 """
 
-import json
+import os
+from functools import lru_cache
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
+from ddr5_power_tool._compat import DATACLASS_SLOTS, load_json
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class MemoryPowerSpec:
     """Memory power specification from datasheet."""
     idd0: float  # mA, average activate cycle current
@@ -26,7 +28,7 @@ class MemoryPowerSpec:
     temperature: float = 50  # degrees C
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class MemoryTimingSpec:
     """Memory timing specification from JEDEC."""
     tck: float  # ns, clock cycle
@@ -51,7 +53,7 @@ class MemoryTimingSpec:
             self.trc = self.tras + self.trp
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ArchitectureSpec:
     """Memory architecture specification."""
     nbr_of_ranks: int
@@ -64,6 +66,19 @@ class ArchitectureSpec:
     refresh_mode: str = "all-bank"  # "all-bank" or "per-bank"
 
 
+# JSON key and default for each ArchitectureSpec field, in field order
+_ARCH_FIELDS = (
+    ("nbrOfRanks", 1),
+    ("nbrOfBanks", 16),
+    ("nbrOfColumns", 1024),
+    ("nbrOfRows", 65536),
+    ("width", 64),
+    ("burstLength", 16),
+    ("density", 16),
+    ("refreshMode", "all-bank"),
+)
+
+
 @dataclass
 class MemorySpec:
     """Complete memory specification."""
@@ -73,29 +88,31 @@ class MemorySpec:
 
     @classmethod
     def from_json(cls, json_path: str) -> "MemorySpec":
-        """Load specification from JSON file."""
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-        
+        """
+        Load specification from JSON file.
+        The parsed JSON is cached per file path, size and modification time;
+        every call returns a new MemorySpec built from it.
+        """
+        stat = os.stat(json_path)
+        return cls.from_dict(_load_spec_data(os.path.abspath(json_path), stat.st_mtime_ns,
+                                             stat.st_size))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemorySpec":
+        """Create specification from a parsed JSON dictionary."""
         mempowerspec = data.get("mempowerspec", {})
         memtimingspec = data.get("memtimingspec", {})
         architecture = data.get("architecture", {})
         
-        # Convert camelCase to snake_case for architecture
-        arch_dict = {
-            "nbr_of_ranks": architecture.get("nbrOfRanks", 1),
-            "nbr_of_banks": architecture.get("nbrOfBanks", 16),
-            "nbr_of_columns": architecture.get("nbrOfColumns", 1024),
-            "nbr_of_rows": architecture.get("nbrOfRows", 65536),
-            "width": architecture.get("width", 64),
-            "burst_length": architecture.get("burstLength", 16),
-            "density": architecture.get("density", 16),
-            "refresh_mode": architecture.get("refreshMode", "all-bank")
-        }
-        
         power_spec = MemoryPowerSpec(**mempowerspec)
         timing_spec = MemoryTimingSpec(**memtimingspec)
-        arch_spec = ArchitectureSpec(**arch_dict)
+        arch_spec = ArchitectureSpec(*[architecture.get(key, default)
+                                       for key, default in _ARCH_FIELDS])
         
         return cls(power=power_spec, timing=timing_spec, architecture=arch_spec)
 
+
+@lru_cache(maxsize=32)
+def _load_spec_data(json_path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse a spec file; the file stat is part of the key so edits are reloaded."""
+    return load_json(json_path)
@@ -2,128 +2,233 @@
 DRAM state machine and timing constraint tracking.
 """
 
-from typing import Dict, Optional, List
+from typing import Optional, List
 from dataclasses import dataclass, field
-from enum import Enum
+from enum import IntEnum
+import numpy as np
+from ddr5_power_tool._compat import DATACLASS_SLOTS
+from ddr5_power_tool._constraints_njit import (
+    STATE_BITS, STATE_MASK, ERR_ALREADY_ACTIVE, ERR_REFRESHING, ERR_TRC, ERR_NOT_ACTIVE, ERR_TRCD,
+    ERR_ALREADY_IDLE, ERR_TRAS, ERR_TWR, ERR_TREFI, ERR_NO_ROW, ERR_NO_BANK,
+    check_activate, check_column, check_precharge, check_precharge_no_write, check_refresh,
+)
+from ddr5_power_tool._trace_njit import run_trace
 from ddr5_power_tool.workload_parser import CommandType
 from ddr5_power_tool.spec_parser import MemorySpec
 
 
-class BankState(Enum):
-    """Bank state enumeration."""
-    IDLE = "IDLE"  # Precharged
-    ACTIVE = "ACTIVE"  # Row open
-    ACTIVE_PDN = "ACTIVE_PDN"  # Active power-down
-    PRE_PDN = "PRE_PDN"  # Precharged power-down
-    REFRESHING = "REFRESHING"  # Currently refreshing
+class BankState(IntEnum):
+    """Bank state enumeration; values are the codes stored in the bank-state arrays."""
+    IDLE = 0  # Precharged
+    ACTIVE = 1  # Row open
+    ACTIVE_PDN = 2  # Active power-down
+    PRE_PDN = 3  # Precharged power-down
+    REFRESHING = 4  # Currently refreshing
 
 
-@dataclass
+N_BANK_STATES = len(BankState)
+
+
+# Plain int state codes for the per-command paths
+_IDLE = BankState.IDLE.value
+_ACTIVE = BankState.ACTIVE.value
+_ACTIVE_PDN = BankState.ACTIVE_PDN.value
+_REFRESHING = BankState.REFRESHING.value
+_STATES = tuple(BankState)
+
+
+# Error message for each constraint check result code; {value} is the elapsed time in ns
+_ERROR_MESSAGES = {
+    ERR_ALREADY_ACTIVE: "Bank already active",
+    ERR_REFRESHING: "Bank is refreshing",
+    ERR_TRC: "tRC violation: {value:.2f} < {timing.trc}",
+    ERR_NOT_ACTIVE: "Bank must be active for {operation}",
+    ERR_TRCD: "tRCD violation: {value:.2f} < {timing.trcd}",
+    ERR_ALREADY_IDLE: "Bank already idle",
+    ERR_TRAS: "tRAS violation: {value:.2f} < {timing.tras}",
+    ERR_TWR: "tWR violation: {value:.2f} < {timing.twr}",
+    ERR_TREFI: "tREFI violation: {value:.2f} < {timing.trfi}",
+    ERR_NO_ROW: "ACT command requires row",
+    ERR_NO_BANK: "REFPB command requires bank",
+}
+
+
+@dataclass(**DATACLASS_SLOTS)
 class BankStateInfo:
-    """State information for a single bank."""
-    state: BankState = BankState.IDLE
-    open_row: Optional[int] = None
-    last_activate_time: float = 0.0  # ns
-    last_precharge_time: float = 0.0  # ns
-    last_read_time: float = 0.0  # ns
-    last_write_time: float = 0.0  # ns
-    last_powerdown_time: float = 0.0  # ns
+    """Live view of a single bank's state in a DRAMStateMachine."""
+    state_machine: "DRAMStateMachine" = field(repr=False)
+    idx: int  # rank * nbr_of_banks + bank
+
+    @property
+    def state(self) -> BankState:
+        return _STATES[int(self.state_machine.state_row[self.idx]) & STATE_MASK]
+
+    @property
+    def open_row(self) -> Optional[int]:
+        word = int(self.state_machine.state_row[self.idx])
+        return word >> STATE_BITS if word & STATE_MASK in (_ACTIVE, _ACTIVE_PDN) else None
+
+    @property
+    def last_activate_time(self) -> float:  # ns
+        return float(self.state_machine.last_activate_time[self.idx])
+
+    @property
+    def last_precharge_time(self) -> float:  # ns
+        return float(self.state_machine.last_precharge_time[self.idx])
+
+    @property
+    def last_read_time(self) -> float:  # ns
+        return float(self.state_machine.last_read_time[self.idx])
+
+    @property
+    def last_write_time(self) -> float:  # ns
+        return float(self.state_machine.last_write_time[self.idx])
+
+    @property
+    def last_powerdown_time(self) -> float:  # ns
+        return float(self.state_machine.last_powerdown_time[self.idx])
 
 
 @dataclass
 class TimingConstraints:
-    """Timing constraint checker."""
+    """
+    Timing constraint checker.
+    The can_* checks run as JIT-compiled kernels and return a result code
+    (CHECK_OK or an ERR_* code); error_message formats a failed result.
+    """
     spec: MemorySpec
     
-    def can_activate(self, bank_info: BankStateInfo, current_time: float) -> tuple[bool, Optional[str]]:
-        """Check if ACTIVATE command can be issued."""
-        if bank_info.state == BankState.ACTIVE:
-            return False, "Bank already active"
-        
-        if bank_info.state == BankState.REFRESHING:
-            return False, "Bank is refreshing"
-        
-        # Check tRC constraint (time since last activate)
-        if bank_info.last_activate_time > 0:
-            time_since_activate = current_time - bank_info.last_activate_time
-            if time_since_activate < self.spec.timing.trc:
-                return False, f"tRC violation: {time_since_activate:.2f} < {self.spec.timing.trc}"
-        
-        return True, None
+    def __post_init__(self):
+        """Cache the timing parameters read by every check (ns)."""
+        timing = self.spec.timing
+        self._trc = float(timing.trc)
+        self._trcd = float(timing.trcd)
+        self._tras = float(timing.tras)
+        self._twr = float(timing.twr)
+        self._trfi = float(timing.trfi)
+    
+    def error_message(self, code: int, value: float = 0.0, operation: str = "read") -> str:
+        """Format the error message for a failed check result code."""
+        return _ERROR_MESSAGES[code].format(value=value, timing=self.spec.timing,
+                                            operation=operation)
     
-    def can_read(self, bank_info: BankStateInfo, current_time: float) -> tuple[bool, Optional[str]]:
+    def can_activate(self, state: int, last_activate_time: float, current_time: float) -> int:
+        """Check if ACTIVATE command can be issued (state is a BankState code)."""
+        return check_activate(state, last_activate_time, current_time, self._trc)
+    
+    def can_read(self, state: int, last_activate_time: float, current_time: float) -> int:
         """Check if READ command can be issued."""
-        if bank_info.state != BankState.ACTIVE:
-            return False, "Bank must be active for read"
-        
-        # Check tRCD constraint
-        time_since_activate = current_time - bank_info.last_activate_time
-        if time_since_activate < self.spec.timing.trcd:
-            return False, f"tRCD violation: {time_since_activate:.2f} < {self.spec.timing.trcd}"
-        
-        return True, None
+        return check_column(state, last_activate_time, current_time, self._trcd)
     
-    def can_write(self, bank_info: BankStateInfo, current_time: float) -> tuple[bool, Optional[str]]:
+    def can_write(self, state: int, last_activate_time: float, current_time: float) -> int:
         """Check if WRITE command can be issued."""
-        if bank_info.state != BankState.ACTIVE:
-            return False, "Bank must be active for write"
-        
-        # Check tRCD constraint
-        time_since_activate = current_time - bank_info.last_activate_time
-        if time_since_activate < self.spec.timing.trcd:
-            return False, f"tRCD violation: {time_since_activate:.2f} < {self.spec.timing.trcd}"
-        
-        return True, None
+        return check_column(state, last_activate_time, current_time, self._trcd)
     
-    def can_precharge(self, bank_info: BankStateInfo, current_time: float) -> tuple[bool, Optional[str]]:
+    def can_precharge(self, state: int, last_activate_time: float, last_write_time: float,
+                      current_time: float) -> int:
         """Check if PRECHARGE command can be issued."""
-        if bank_info.state == BankState.IDLE:
-            return False, "Bank already idle"
-        
-        if bank_info.state == BankState.REFRESHING:
-            return False, "Bank is refreshing"
-        
-        # Check tRAS constraint (min time row must be active)
-        # Only check if bank was activated (is in ACTIVE state)
-        if bank_info.state == BankState.ACTIVE and bank_info.last_activate_time >= 0:
-            time_since_activate = current_time - bank_info.last_activate_time
-            if time_since_activate < self.spec.timing.tras:
-                return False, f"tRAS violation: {time_since_activate:.2f} < {self.spec.timing.tras}"
-        
-        # Check tWR constraint (write recovery)
-        if bank_info.last_write_time > 0:
-            time_since_write = current_time - bank_info.last_write_time
-            if time_since_write < self.spec.timing.twr:
-                return False, f"tWR violation: {time_since_write:.2f} < {self.spec.timing.twr}"
-        
-        return True, None
+        return check_precharge(state, last_activate_time, last_write_time, current_time,
+                               self._tras, self._twr)
     
-    def can_refresh(self, current_time: float, last_refresh_time: float) -> tuple[bool, Optional[str]]:
+    def can_precharge_no_write(self, state: int, last_activate_time: float,
+                               current_time: float) -> int:
+        """Check if PRECHARGE command can be issued to a bank that was never written."""
+        return check_precharge_no_write(state, last_activate_time, current_time, self._tras)
+    
+    def can_refresh(self, current_time: float, last_refresh_time: float) -> int:
         """Check if REFRESH command can be issued."""
-        time_since_refresh = current_time - last_refresh_time
-        if time_since_refresh < self.spec.timing.trfi:
-            return False, f"tREFI violation: {time_since_refresh:.2f} < {self.spec.timing.trfi}"
-        return True, None
+        return check_refresh(current_time, last_refresh_time, self._trfi)
 
 
 class DRAMStateMachine:
-    """DRAM state machine for tracking bank states."""
+    """
+    DRAM state machine for tracking bank states.
+    Per-bank fields are stored as flat arrays indexed by rank * nbr_of_banks + bank;
+    state and open row share one packed word per bank in state_row.
+    """
     
     def __init__(self, spec: MemorySpec):
         self.spec = spec
-        self.banks: Dict[tuple[int, int], BankStateInfo] = {}  # (rank, bank) -> state
         self.constraints = TimingConstraints(spec)
+        
+        self.n_ranks = spec.architecture.nbr_of_ranks
+        self.n_banks = spec.architecture.nbr_of_banks
+        n_total = self.n_ranks * self.n_banks
+        
+        # state_row: state code in the low STATE_BITS bits, open row above them
+        # (int64 leaves room for any row the int32 row column can hold)
+        self.state_row = np.empty(n_total, dtype=np.int64)
+        self.last_activate_time = np.empty(n_total)  # ns
+        self.last_precharge_time = np.empty(n_total)  # ns
+        self.last_read_time = np.empty(n_total)  # ns
+        self.last_write_time = np.empty(n_total)  # ns
+        self.last_powerdown_time = np.empty(n_total)  # ns
+        self.reset()
+    
+    def reset(self):
+        """
+        Return all banks to IDLE with no open row and clear all command times.
+        Arrays are cleared in place, so views held by other objects stay valid.
+        """
         self.last_refresh_time: float = -1e9  # ns
         self.current_time: float = 0.0  # ns
         
-        # Initialize all banks
-        for rank in range(spec.architecture.nbr_of_ranks):
-            for bank in range(spec.architecture.nbr_of_banks):
-                self.banks[(rank, bank)] = BankStateInfo()
+        self.state_row.fill(_IDLE)
+        for times in (self.last_activate_time, self.last_precharge_time, self.last_read_time,
+                      self.last_write_time, self.last_powerdown_time):
+            times.fill(0.0)
+        
+        # Bit idx set while the bank at flat index idx is ACTIVE
+        self._active_mask: int = 0
+        
+        # PRECHARGE check, specialized by set_read_only
+        self._check_precharge = self._check_precharge_full
+    
+    # The decoded views below are read-only snapshots of state_row; banks change
+    # only through the execute_* methods
+    
+    @property
+    def state(self) -> np.ndarray:
+        """State code of every bank, by flat index (read-only snapshot)."""
+        state = (self.state_row & STATE_MASK).astype(np.int8)
+        state.flags.writeable = False
+        return state
+    
+    @property
+    def state_arr(self) -> np.ndarray:
+        """State code of every bank as a (rank, bank) array (read-only snapshot)."""
+        return self.state.reshape(self.n_ranks, self.n_banks)
+    
+    @property
+    def open_row(self) -> np.ndarray:
+        """Open row of every bank, by flat index; -1 when no row is open (read-only snapshot)."""
+        state = self.state_row & STATE_MASK
+        has_row = (state == _ACTIVE) | (state == _ACTIVE_PDN)
+        open_row = np.where(has_row, self.state_row >> STATE_BITS, -1)
+        open_row.flags.writeable = False
+        return open_row
+    
+    def _bank_index(self, rank: int, bank: int) -> int:
+        """Flat index of a bank; an unknown (rank, bank) raises KeyError."""
+        if not (0 <= rank < self.n_ranks and 0 <= bank < self.n_banks):
+            raise KeyError((rank, bank))
+        return rank * self.n_banks + bank
     
     def get_bank_info(self, rank: int, bank: int) -> BankStateInfo:
-        """Get state info for a bank."""
-        return self.banks[(rank, bank)]
+        """Get a live view of the state info for a bank."""
+        return BankStateInfo(self, self._bank_index(rank, bank))
+    
+    def _format_error(self, code: int, idx: int = -1, operation: str = "read") -> str:
+        """Format the message for a failed check on the bank at a flat index."""
+        if code == ERR_TREFI:
+            value = self.current_time - self.last_refresh_time
+        elif code == ERR_TWR:
+            value = self.current_time - self.last_write_time[idx]
+        elif code in (ERR_TRC, ERR_TRCD, ERR_TRAS):
+            value = self.current_time - self.last_activate_time[idx]
+        else:
+            value = 0.0
+        return self.constraints.error_message(code, value, operation)
     
     def update_time(self, time_ns: float):
         """Update current simulation time."""
@@ -131,90 +236,172 @@ class DRAMStateMachine:
     
     def execute_activate(self, rank: int, bank: int, row: int) -> tuple[bool, Optional[str]]:
         """Execute ACTIVATE command."""
-        bank_info = self.get_bank_info(rank, bank)
-        can_execute, error = self.constraints.can_activate(bank_info, self.current_time)
+        idx = self._bank_index(rank, bank)
+        code = self.constraints.can_activate(
+            int(self.state_row[idx]) & STATE_MASK, self.last_activate_time[idx], self.current_time
+        )
         
-        if not can_execute:
-            return False, error
+        if code:
+            return False, self._format_error(code, idx)
         
-        bank_info.state = BankState.ACTIVE
-        bank_info.open_row = row
-        bank_info.last_activate_time = self.current_time
+        self.state_row[idx] = _ACTIVE | (row << STATE_BITS)
+        self.last_activate_time[idx] = self.current_time
+        self._active_mask |= 1 << idx
         return True, None
     
     def execute_read(self, rank: int, bank: int) -> tuple[bool, Optional[str]]:
         """Execute READ command."""
-        bank_info = self.get_bank_info(rank, bank)
-        can_execute, error = self.constraints.can_read(bank_info, self.current_time)
+        idx = self._bank_index(rank, bank)
+        code = self.constraints.can_read(
+            int(self.state_row[idx]) & STATE_MASK, self.last_activate_time[idx], self.current_time
+        )
         
-        if not can_execute:
-            return False, error
+        if code:
+            return False, self._format_error(code, idx, "read")
         
-        bank_info.last_read_time = self.current_time
+        self.last_read_time[idx] = self.current_time
         return True, None
     
     def execute_write(self, rank: int, bank: int) -> tuple[bool, Optional[str]]:
         """Execute WRITE command."""
-        bank_info = self.get_bank_info(rank, bank)
-        can_execute, error = self.constraints.can_write(bank_info, self.current_time)
+        idx = self._bank_index(rank, bank)
+        code = self.constraints.can_write(
+            int(self.state_row[idx]) & STATE_MASK, self.last_activate_time[idx], self.current_time
+        )
         
-        if not can_execute:
-            return False, error
+        if code:
+            return False, self._format_error(code, idx, "write")
         
-        bank_info.last_write_time = self.current_time
+        self.last_write_time[idx] = self.current_time
+        self._check_precharge = self._check_precharge_full
         return True, None
     
+    def set_read_only(self, read_only: bool):
+        """
+        Hint whether upcoming commands include no WRITEs. While no bank has been
+        written, PRECHARGE checks then skip the tWR test; any WRITE restores it.
+        """
+        if read_only and not self.last_write_time.any():
+            self._check_precharge = self._check_precharge_no_write
+        else:
+            self._check_precharge = self._check_precharge_full
+    
+    def _check_precharge_full(self, idx: int) -> int:
+        """Check PRECHARGE constraints for the bank at a flat index."""
+        return self.constraints.can_precharge(
+            int(self.state_row[idx]) & STATE_MASK, self.last_activate_time[idx],
+            self.last_write_time[idx], self.current_time
+        )
+    
+    def _check_precharge_no_write(self, idx: int) -> int:
+        """Check PRECHARGE constraints, assuming no bank has been written."""
+        return self.constraints.can_precharge_no_write(
+            int(self.state_row[idx]) & STATE_MASK, self.last_activate_time[idx],
+            self.current_time
+        )
+    
     def execute_precharge(self, rank: int, bank: int) -> tuple[bool, Optional[str]]:
         """Execute PRECHARGE command."""
-        bank_info = self.get_bank_info(rank, bank)
-        can_execute, error = self.constraints.can_precharge(bank_info, self.current_time)
+        idx = self._bank_index(rank, bank)
+        code = self._check_precharge(idx)
         
-        if not can_execute:
-            return False, error
+        if code:
+            return False, self._format_error(code, idx)
         
-        bank_info.state = BankState.IDLE
-        bank_info.open_row = None
-        bank_info.last_precharge_time = self.current_time
+        self.state_row[idx] = _IDLE
+        self.last_precharge_time[idx] = self.current_time
+        self._active_mask &= ~(1 << idx)
         return True, None
     
+    def execute_precharge_all(self, rank: int) -> tuple[bool, Optional[str]]:
+        """
+        Execute PRECHARGE ALL command on every bank of a rank.
+        Open banks are precharged individually; the command fails if any bank
+        cannot be precharged, reporting the error of the highest failing bank.
+        """
+        self._bank_index(rank, 0)
+        states = self.state_arr[rank]
+        
+        # Idle and refreshing banks always fail; only open banks need timing checks
+        blocked = (states == _IDLE) | (states == _REFRESHING)
+        blocked_banks = np.flatnonzero(blocked)
+        
+        error_bank = -1
+        error_msg = None
+        for bank in np.flatnonzero(~blocked).tolist():
+            success, error = self.execute_precharge(rank, bank)
+            if not success:
+                error_bank = bank
+                error_msg = error
+        
+        if len(blocked_banks) and blocked_banks[-1] > error_bank:
+            idx = rank * self.n_banks + int(blocked_banks[-1])
+            error_msg = self._format_error(self._check_precharge(idx), idx)
+        
+        return error_msg is None, error_msg
+    
     def execute_refresh(self) -> tuple[bool, Optional[str]]:
         """Execute REFRESH command."""
-        can_execute, error = self.constraints.can_refresh(self.current_time, self.last_refresh_time)
-        
-        if not can_execute:
-            return False, error
+        code = self.constraints.can_refresh(self.current_time, self.last_refresh_time)
         
-        # Mark all banks as refreshing
-        for bank_info in self.banks.values():
-            if bank_info.state == BankState.ACTIVE:
-                bank_info.state = BankState.REFRESHING
+        if code:
+            return False, self._format_error(code)
         
         self.last_refresh_time = self.current_time
         
-        # Refresh completes after tRFC
-        refresh_end_time = self.current_time + self.spec.timing.trfc
-        
-        # After refresh, banks return to their previous state (or IDLE)
-        for bank_info in self.banks.values():
-            if bank_info.state == BankState.REFRESHING:
-                bank_info.state = BankState.IDLE
-                bank_info.open_row = None
+        # Refresh completes within tRFC and is not tracked as a separate state:
+        # open (or refreshing) banks are closed and return to IDLE in one pass
+        state = self.state_row & STATE_MASK
+        refreshed = (state == _ACTIVE) | (state == _REFRESHING)
+        self.state_row[refreshed] = _IDLE
+        self._active_mask = 0
         
         return True, None
     
+    def run_trace(self, codes: np.ndarray, times_ns: np.ndarray, ranks: np.ndarray,
+                  banks: np.ndarray, rows: np.ndarray, end_time_ns: float):
+        """
+        Execute a command sequence in one JIT-compiled loop (see _trace_njit.run_trace).
+        Commands must already exclude END_OF_SIMULATION, PDN and SR.
+        Returns (results, values, state_time_ns), with bank-time per state up to end_time_ns.
+        """
+        constraints = self.constraints
+        results, values, state_time_ns, last_refresh_time = run_trace(
+            codes, times_ns, ranks, banks, rows,
+            self.state_row, self.last_activate_time, self.last_precharge_time,
+            self.last_read_time, self.last_write_time,
+            self.n_banks, N_BANK_STATES, float(end_time_ns), float(self.last_refresh_time),
+            constraints._trc, constraints._trcd, constraints._tras,
+            constraints._twr, constraints._trfi,
+        )
+        self.last_refresh_time = float(last_refresh_time)
+        self._sync_active_mask()
+        if len(times_ns):
+            self.current_time = float(times_ns[-1])
+        return results, values, state_time_ns
+    
+    def _sync_active_mask(self):
+        """Rebuild the active-bank bitmask from the state array."""
+        bits = np.packbits(self.state == _ACTIVE, bitorder="little")
+        self._active_mask = int.from_bytes(bits.tobytes(), "little")
+    
+    @property
+    def active_count(self) -> int:
+        """Number of currently active banks."""
+        return bin(self._active_mask).count("1")
+    
     def get_active_banks(self) -> List[tuple[int, int]]:
         """Get list of currently active banks."""
         active = []
-        for (rank, bank), info in self.banks.items():
-            if info.state == BankState.ACTIVE:
-                active.append((rank, bank))
+        mask = self._active_mask
+        while mask:
+            low_bit = mask & -mask
+            active.append(divmod(low_bit.bit_length() - 1, self.n_banks))
+            mask ^= low_bit
         return active
     
     def get_idle_banks(self) -> List[tuple[int, int]]:
         """Get list of currently idle banks."""
-        idle = []
-        for (rank, bank), info in self.banks.items():
-            if info.state == BankState.IDLE:
-                idle.append((rank, bank))
-        return idle
-
+        n_banks = self.n_banks
+        return [(idx // n_banks, idx % n_banks)
+                for idx in np.flatnonzero(self.state == _IDLE).tolist()]
@@ -2,10 +2,12 @@
 Workload parser for command traces.
 """
 
-import json
-from typing import List, Dict, Any, Optional
+from types import MappingProxyType
+from typing import List, Dict, Any, Iterable, Mapping, NamedTuple, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
+import numpy as np
+from ddr5_power_tool._compat import DATACLASS_SLOTS, ijson, load_json
 
 
 class CommandType(Enum):
@@ -22,9 +24,39 @@ class CommandType(Enum):
     END_OF_SIMULATION = "END_OF_SIMULATION"
 
 
-@dataclass
-class Command:
-    """Single DRAM command."""
+# Integer code for each command type, used to index per-command lookup tables
+CMD_CODE: Dict[CommandType, int] = {cmd: i for i, cmd in enumerate(CommandType)}
+CMD_TYPES: Tuple[CommandType, ...] = tuple(CMD_CODE)
+N_COMMAND_TYPES = len(CMD_CODE)
+
+# Command name (as written in workload files) -> CommandType / CMD_CODE
+_CMD_LOOKUP: Dict[str, CommandType] = {cmd.name: cmd for cmd in CommandType}
+_CMD_STR_TO_INT: Dict[str, int] = {cmd.name: i for i, cmd in enumerate(CommandType)}
+
+# Packed record layout for a command trace; missing optional fields are stored as -1
+CMD_DTYPE = np.dtype([
+    ("timestamp", np.int64),
+    ("code", np.int8),
+    ("rank", np.int16),
+    ("bank", np.int16),
+    ("row", np.int32),
+    ("column", np.int32),
+    ("burst_length", np.int16),
+])
+
+# Layout for traces with fractional (float) cycle timestamps
+CMD_DTYPE_FLOAT = np.dtype([("timestamp", np.float64)] + CMD_DTYPE.descr[1:])
+
+
+def _record_dtype(timestamps: Iterable) -> np.dtype:
+    """CMD_DTYPE when every timestamp is an integer, else CMD_DTYPE_FLOAT."""
+    if all(isinstance(t, (int, np.integer)) for t in timestamps):
+        return CMD_DTYPE
+    return CMD_DTYPE_FLOAT
+
+
+class Command(NamedTuple):
+    """Single DRAM command (immutable record)."""
     timestamp: int  # clock cycles
     command: CommandType
     bank: Optional[int] = None
@@ -33,37 +65,105 @@ class Command:
     column: Optional[int] = None
     burst_length: Optional[int] = None
 
+    @property
+    def code(self) -> int:
+        """Integer code of the command type (see CMD_CODE)."""
+        return CMD_CODE[self.command]
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Command":
         """Create command from dictionary."""
         cmd_str = data.get("command", "").upper()
         try:
-            cmd_type = CommandType[cmd_str]
+            cmd_type = _CMD_LOOKUP[cmd_str]
         except KeyError:
-            raise ValueError(f"Unknown command type: {cmd_str}")
+            raise ValueError(f"Unknown command type: {cmd_str}") from None
         
         return cls(
-            timestamp=data["timestamp"],
-            command=cmd_type,
-            bank=data.get("bank"),
-            rank=data.get("rank", 0),
-            row=data.get("row"),
-            column=data.get("column"),
-            burst_length=data.get("burstLength")
+            data["timestamp"],
+            cmd_type,
+            data.get("bank"),
+            data.get("rank", 0),
+            data.get("row"),
+            data.get("column"),
+            data.get("burstLength")
         )
 
 
-@dataclass
+def _check_address(rank: Optional[int], bank: Optional[int], row: Optional[int]):
+    """
+    Reject explicit negative addresses, which the -1 "missing" marker would hide.
+    Negative ranks and banks raise KeyError((rank, bank)) as an unknown bank does,
+    with 0 standing in for a missing rank or bank.
+    """
+    if (rank is not None and rank < 0) or (bank is not None and bank < 0):
+        raise KeyError((0 if rank is None else rank, 0 if bank is None else bank))
+    if row is not None and row < 0:
+        raise ValueError(f"Invalid row: {row}")
+
+
+def commands_to_array(commands: List[Command]) -> np.ndarray:
+    """Pack commands into a CMD_DTYPE array, stably sorted by timestamp."""
+    for cmd in commands:
+        _check_address(cmd.rank, cmd.bank, cmd.row)
+    
+    timestamps = [cmd.timestamp for cmd in commands]
+    arr = np.empty(len(commands), dtype=_record_dtype(timestamps))
+    arr["timestamp"] = timestamps
+    arr["code"] = [cmd.code for cmd in commands]
+    for name in ("rank", "bank", "row", "column", "burst_length"):
+        values = [getattr(cmd, name) for cmd in commands]
+        arr[name] = [-1 if value is None else value for value in values]
+    
+    order = np.argsort(arr["timestamp"], kind="stable")
+    return arr[order]
+
+
+# Commands packed per chunk when building arrays from a stream of dictionaries
+_CHUNK_SIZE = 65536
+
+
+def pack_command_dicts(commands: Iterable[Dict[str, Any]]) -> np.ndarray:
+    """
+    Pack command dictionaries into a CMD_DTYPE array (in input order).
+    Records are converted in fixed-size chunks, so only one chunk of Python
+    tuples is alive at a time when commands come from a stream. If any
+    timestamp is a float, the whole trace uses CMD_DTYPE_FLOAT.
+    """
+    chunks = []
+    records = []
+    for data in commands:
+        cmd_str = data.get("command", "").upper()
+        try:
+            code = _CMD_STR_TO_INT[cmd_str]
+        except KeyError:
+            raise ValueError(f"Unknown command type: {cmd_str}") from None
+        fields = (data.get("rank", 0), data.get("bank"), data.get("row"),
+                  data.get("column"), data.get("burstLength"))
+        _check_address(*fields[:3])
+        records.append((data["timestamp"], code,
+                        *(-1 if value is None else value for value in fields)))
+        if len(records) == _CHUNK_SIZE:
+            chunks.append(np.array(records, dtype=_record_dtype(r[0] for r in records)))
+            records = []
+    
+    chunks.append(np.array(records, dtype=_record_dtype(r[0] for r in records)))
+    if any(chunk.dtype == CMD_DTYPE_FLOAT for chunk in chunks):
+        chunks = [chunk.astype(CMD_DTYPE_FLOAT) for chunk in chunks]
+    return np.concatenate(chunks)
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class WorkloadMetadata:
-    """Workload metadata."""
+    """Workload metadata (immutable, so default instances can be shared)."""
     data_rate: int = 6400  # MT/s
     temperature: float = 50  # degrees C
-    toggle_rates: Optional[Dict[str, float]] = None
+    toggle_rates: Optional[Mapping[str, float]] = None
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "WorkloadMetadata":
         """Create metadata from dictionary."""
-        toggle_rates = data.get("toggleRates", {})
+        toggle_rates = data.get("toggleRates", _EMPTY_TOGGLE)
         return cls(
             data_rate=data.get("dataRate", 6400),
             temperature=data.get("temperature", 50),
@@ -71,24 +171,112 @@ class WorkloadMetadata:
         )
 
 
+# Shared instances for workloads without a metadata section / toggle rates
+_DEFAULT_METADATA = WorkloadMetadata()
+_EMPTY_TOGGLE: Mapping[str, float] = MappingProxyType({})
+
+
+@dataclass(**DATACLASS_SLOTS)
+class WorkloadArrays:
+    """
+    Workload commands as struct-of-arrays columns, sorted by timestamp.
+    Columns use the CMD_DTYPE field types; missing optional fields are -1.
+    """
+    timestamp: np.ndarray  # clock cycles (int64, or float64 if any are fractional)
+    code: np.ndarray  # CMD_CODE
+    rank: np.ndarray
+    bank: np.ndarray
+    row: np.ndarray
+    column: np.ndarray
+    burst_length: np.ndarray
+    metadata: WorkloadMetadata = _DEFAULT_METADATA
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    @classmethod
+    def from_array(cls, commands: np.ndarray,
+                   metadata: Optional[WorkloadMetadata] = None) -> "WorkloadArrays":
+        """Split a timestamp-sorted CMD_DTYPE array into contiguous columns."""
+        columns = {name: np.ascontiguousarray(commands[name]) for name in CMD_DTYPE.names}
+        return cls(**columns, metadata=metadata or _DEFAULT_METADATA)
+
+    @classmethod
+    def from_commands(cls, commands: List[Command],
+                      metadata: Optional[WorkloadMetadata] = None) -> "WorkloadArrays":
+        """Build columns from Command objects, sorted by timestamp."""
+        return cls.from_array(commands_to_array(commands), metadata)
+
+    @classmethod
+    def from_dicts(cls, commands: Iterable[Dict[str, Any]],
+                   metadata: Optional[WorkloadMetadata] = None) -> "WorkloadArrays":
+        """Build columns directly from command dictionaries, without Command objects."""
+        arr = pack_command_dicts(commands)
+        order = np.argsort(arr["timestamp"], kind="stable")
+        return cls.from_array(arr[order], metadata)
+
+    def to_commands(self) -> List[Command]:
+        """Materialize the columns as Command objects."""
+        optional = [getattr(self, name).tolist()
+                    for name in ("bank", "rank", "row", "column", "burst_length")]
+        return [
+            Command(timestamp, CMD_TYPES[code], *(None if value < 0 else value for value in values))
+            for timestamp, code, *values in zip(self.timestamp.tolist(), self.code.tolist(),
+                                                *optional)
+        ]
+
+
 @dataclass
 class Workload:
     """Complete workload specification."""
     commands: List[Command]
     metadata: WorkloadMetadata
 
+    def to_array(self) -> np.ndarray:
+        """
+        Get commands as a timestamp-sorted CMD_DTYPE array.
+        Built from the current command list on every call, so edits to it are seen.
+        """
+        return commands_to_array(self.commands)
+
+    def to_arrays(self) -> WorkloadArrays:
+        """Get the commands as contiguous per-field columns, in timestamp order."""
+        return WorkloadArrays.from_array(self.to_array(), self.metadata)
+
     @classmethod
     def from_json(cls, json_path: str) -> "Workload":
         """Load workload from JSON file."""
-        with open(json_path, 'r') as f:
-            data = json.load(f)
+        return cls.from_dict(load_json(json_path))
+
+    @staticmethod
+    def from_json_arrays(json_path: str) -> WorkloadArrays:
+        """
+        Load a workload JSON file directly into struct-of-arrays columns.
+        With ijson installed, commands are streamed from the file instead of
+        materializing the whole command list.
+        """
+        if ijson is not None:
+            with open(json_path, 'rb') as f:
+                commands = pack_command_dicts(ijson.items(f, "commands.item", use_float=True))
+                f.seek(0)
+                metadata_dict = next(ijson.items(f, "metadata", use_float=True), {})
+        else:
+            data = load_json(json_path)
+            commands = pack_command_dicts(data.get("commands", []))
+            metadata_dict = data.get("metadata", {})
         
+        metadata = WorkloadMetadata.from_dict(metadata_dict) if metadata_dict else _DEFAULT_METADATA
+        order = np.argsort(commands["timestamp"], kind="stable")
+        return WorkloadArrays.from_array(commands[order], metadata)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Workload":
+        """Create workload from a parsed JSON dictionary."""
         commands = [Command.from_dict(cmd) for cmd in data.get("commands", [])]
         metadata_dict = data.get("metadata", {})
         if metadata_dict:
             metadata = WorkloadMetadata.from_dict(metadata_dict)
         else:
-            metadata = WorkloadMetadata()
+            metadata = _DEFAULT_METADATA
         
         return cls(commands=commands, metadata=metadata)
-
@@ -1,17 +1,70 @@
 #!/usr/bin/env python3
 """Run all tests."""
 
+import argparse
+import io
+import os
 import unittest
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+TEST_DIR = 'tests'
+PATTERN = 'test_*.py'
+
+
+def jobs_arg(value: str) -> int:
+    """Parse --jobs: a positive process count, or "auto" for one per CPU."""
+    if value == "auto":
+        return os.cpu_count() or 1
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = 0
+    if jobs < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer or 'auto', got {value!r}")
+    return jobs
+
+
+def run_module(pattern: str):
+    """Discover and run the tests matching pattern, returning (success, tests run, output)."""
+    stream = io.StringIO()
+    suite = unittest.TestLoader().discover(TEST_DIR, pattern=pattern)
+    result = unittest.TextTestRunner(stream=stream, verbosity=2).run(suite)
+    return result.wasSuccessful(), result.testsRun, stream.getvalue()
+
 
 if __name__ == '__main__':
-    # Discover and run all tests
-    loader = unittest.TestLoader()
-    suite = loader.discover('tests', pattern='test_*.py')
-    
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    # Exit with error code if tests failed
-    sys.exit(0 if result.wasSuccessful() else 1)
+    parser = argparse.ArgumentParser(description="Run all tests")
+    parser.add_argument(
+        "-j", "--jobs",
+        type=jobs_arg,
+        default=1,
+        help="Run test modules in this many parallel processes ('auto' = one per CPU)"
+    )
+    args = parser.parse_args()
+
+    if args.jobs == 1:
+        # Discover and run all tests
+        loader = unittest.TestLoader()
+        suite = loader.discover(TEST_DIR, pattern=PATTERN)
+
+        runner = unittest.TextTestRunner(verbosity=2)
+        result = runner.run(suite)
+
+        # Exit with error code if tests failed
+        sys.exit(0 if result.wasSuccessful() else 1)
+
+    # Test modules share no state, so each one can run in its own process
+    modules = sorted(path.name for path in Path(TEST_DIR).glob(PATTERN))
+    with ProcessPoolExecutor(max_workers=args.jobs) as ex:
+        results = list(ex.map(run_module, modules))
+
+    for _, _, output in results:
+        sys.stderr.write(output)
 
+    passed = all(success for success, _, _ in results)
+    tests_run = sum(n for _, n, _ in results)
+    print(f"Ran {tests_run} tests in {len(modules)} modules: {'OK' if passed else 'FAILED'}",
+          file=sys.stderr)
+    sys.exit(0 if passed else 1)
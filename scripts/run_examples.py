@@ -7,8 +7,9 @@ Run multiple example simulations and generate a pretty formatted report.
 import sys
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 # Set UTF-8 encoding for output (works on Linux/Mac, fallback on Windows)
 if sys.stdout.encoding != 'utf-8':
@@ -84,7 +85,8 @@ def format_time(time_ns: float) -> str:
         return f"{time_ns:.3f} ns"
 
 
-def print_example_result(example: Dict[str, Any], result, simulator: Simulator, index: int):
+def print_example_result(example: Dict[str, Any], result, errors: List[str],
+                         warnings: List[str], index: int):
     """Print formatted result for a single example."""
     print("\n" + "="*80)
     print(f"Example {index + 1}: {example['name']}")
@@ -125,9 +127,6 @@ def print_example_result(example: Dict[str, Any], result, simulator: Simulator,
         print(f"  Core Power:         {core_pct:.1f}%")
         print(f"  Interface Power:   {interface_pct:.1f}%")
     
-    errors = simulator.get_errors()
-    warnings = simulator.get_warnings()
-    
     if errors:
         print(f"\n[ERROR] Errors ({len(errors)}):")
         for error in errors:
@@ -142,6 +141,28 @@ def print_example_result(example: Dict[str, Any], result, simulator: Simulator,
         print(f"\n[OK] Simulation completed successfully!")
 
 
+def _run_one(example: Dict[str, Any], base_dir: Path) -> Tuple[Dict[str, Any], Any, List[str], List[str]]:
+    """Run a single example simulation (in a worker process)."""
+    spec_path = base_dir / example["spec"]
+    workload_path = base_dir / example["workload"]
+    
+    if not spec_path.exists():
+        raise FileNotFoundError(f"Specification file not found: {spec_path}")
+    
+    if not workload_path.exists():
+        raise FileNotFoundError(f"Workload file not found: {workload_path}")
+    
+    # Load specification and workload
+    spec = MemorySpec.from_json(str(spec_path))
+    workload = Workload.from_json(str(workload_path))
+    
+    # Run simulation
+    simulator = Simulator(spec)
+    result = simulator.simulate(workload)
+    
+    return example, result, simulator.get_errors(), simulator.get_warnings()
+
+
 def generate_summary_table(results: List[Dict[str, Any]]):
     """Generate a summary table of all results."""
     print("\n" + "="*80)
@@ -171,44 +192,31 @@ def main():
     print("="*80)
     print(f"Running {len(EXAMPLES)} example configurations...\n")
     
+    # Simulations are independent, so run them in parallel (one process each)
     results = []
-    
-    for i, example in enumerate(EXAMPLES):
-        spec_path = base_dir / example["spec"]
-        workload_path = base_dir / example["workload"]
-        
-        if not spec_path.exists():
-            print(f"[ERROR] Specification file not found: {spec_path}", file=sys.stderr)
-            continue
-        
-        if not workload_path.exists():
-            print(f"[ERROR] Workload file not found: {workload_path}", file=sys.stderr)
-            continue
-        
-        try:
-            # Load specification and workload
-            spec = MemorySpec.from_json(str(spec_path))
-            workload = Workload.from_json(str(workload_path))
-            
-            # Run simulation
-            simulator = Simulator(spec)
-            result = simulator.simulate(workload)
+    with ProcessPoolExecutor(max_workers=len(EXAMPLES)) as ex:
+        futures = [ex.submit(_run_one, example, base_dir=base_dir) for example in EXAMPLES]
+        for i, (example, future) in enumerate(zip(EXAMPLES, futures)):
+            try:
+                example, result, errors, warnings = future.result()
+            except FileNotFoundError as e:
+                print(f"[ERROR] {e}", file=sys.stderr)
+                continue
+            except Exception as e:
+                print(f"\n[ERROR] Error running {example['name']}: {e}", file=sys.stderr)
+                import traceback
+                traceback.print_exc()
+                continue
             
             # Store result
             results.append({
                 "example": example,
                 "result": result,
-                "simulator": simulator
+                "errors": errors
             })
             
-            # Print result
-            print_example_result(example, result, simulator, i)
-            
-        except Exception as e:
-            print(f"\n[ERROR] Error running {example['name']}: {e}", file=sys.stderr)
-            import traceback
-            traceback.print_exc()
-            continue
+            # Print result (in example order)
+            print_example_result(example, result, errors, warnings, i)
     
     # Generate summary
     if results:
@@ -227,7 +235,7 @@ def main():
     print("="*80)
     
     # Exit with error code if any simulations had errors
-    has_errors = any(len(r['simulator'].get_errors()) > 0 for r in results)
+    has_errors = any(len(r['errors']) > 0 for r in results)
     sys.exit(1 if has_errors else 0)
 
 
@@ -11,6 +11,10 @@ setup(
         "numpy>=1.20.0",
         "matplotlib>=3.3.0",
     ],
+    extras_require={
+        "jit": ["numba>=0.56"],
+        "json": ["orjson>=3.6", "ijson>=3.1"],
+    },
     entry_points={
         "console_scripts": [
             "ddr5-power=ddr5_power_tool.cli:main",
@@ -1,10 +1,11 @@
 """Tests for power calculator."""
 
 import unittest
+import numpy as np
 from ddr5_power_tool.spec_parser import MemorySpec, MemoryPowerSpec, MemoryTimingSpec, ArchitectureSpec
 from ddr5_power_tool.state_machine import DRAMStateMachine
 from ddr5_power_tool.power_calculator import PowerCalculator
-from ddr5_power_tool.workload_parser import CommandType
+from ddr5_power_tool.workload_parser import CommandType, CMD_CODE
 
 
 class TestPowerCalculator(unittest.TestCase):
@@ -45,6 +46,22 @@ class TestPowerCalculator(unittest.TestCase):
         # Energy = 110 mW * 10 ns / 1000 = 1.1 nJ (core only, I/O adds more)
         self.assertGreater(energy, 1.0)
     
+    def test_io_parameters_update_energy(self):
+        """Test that changing I/O parameters or the spec is reflected in energies."""
+        read_energy = self.calculator.calculate_read_power(10.0, burst_length=16)
+        termination = self.calculator.calculate_termination_power(10.0)
+        
+        self.calculator.dq_capacitance *= 2
+        self.assertGreater(self.calculator.calculate_read_power(10.0, burst_length=16), read_energy)
+        self.calculator.odt_resistance *= 2
+        self.assertAlmostEqual(self.calculator.calculate_termination_power(10.0), termination / 2)
+        
+        self.spec.power.idd4r += 10.0
+        read_energy = self.calculator.calculate_read_power(10.0, burst_length=16)
+        self.calculator.refresh_coefficients()
+        self.assertAlmostEqual(self.calculator.calculate_read_power(10.0, burst_length=16),
+                               read_energy + 10.0 * 1.1 * 10.0 / 1000.0)
+    
     def test_write_power_calculation(self):
         """Test write power calculation."""
         duration_ns = 10.0
@@ -106,6 +123,41 @@ class TestPowerCalculator(unittest.TestCase):
         # Precharge: (35 * 100 + 25 * 100) * 1.1 / 1000 = (3500 + 2500) * 1.1 / 1000 = 6.6 nJ
         expected_precharge = (35.0 * 100.0 + 25.0 * 100.0) * 1.1 / 1000.0
         self.assertAlmostEqual(bg_precharge, expected_precharge, places=2)
+    
+    def test_batch_matches_per_command(self):
+        """Test that batch processing matches per-command processing."""
+        commands = [
+            (CommandType.ACT, 0.0, 20.0, 16),
+            (CommandType.RD, 20.0, 5.0, 16),
+            (CommandType.WR, 25.0, 7.5, 32),
+            (CommandType.PRE, 32.5, 10.0, 16),
+            (CommandType.PREA, 42.5, 10.0, 16),
+            (CommandType.REF, 52.5, 300.0, 16),
+        ]
+        
+        reference = PowerCalculator(self.spec, self.state_machine)
+        expected_energy = 0.0
+        for cmd_type, time_ns, duration_ns, bl in commands:
+            expected_energy += reference.process_command(
+                cmd_type, 0, 0, time_ns, time_ns + duration_ns, burst_length=bl
+            )
+        
+        energy = self.calculator.process_commands(
+            np.array([CMD_CODE[c[0]] for c in commands]),
+            np.array([c[1] for c in commands]),
+            np.array([c[2] for c in commands]),
+            np.array([c[3] for c in commands], dtype=float)
+        )
+        
+        self.assertAlmostEqual(energy, expected_energy, places=9)
+        reference.finalize(400.0)
+        self.calculator.finalize(400.0)
+        for name in ("activation_energy", "read_energy", "write_energy",
+                     "precharge_energy", "refresh_energy", "termination_energy"):
+            self.assertAlmostEqual(getattr(self.calculator.result, name),
+                                   getattr(reference.result, name), places=9)
+        self.assertEqual(self.calculator.refresh_count, 1)
+        self.assertEqual(self.calculator.last_refresh_time, 52.5)
 
 
 if __name__ == '__main__':
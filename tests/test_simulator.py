@@ -1,17 +1,26 @@
 """Tests for simulator."""
 
 import unittest
+import math
 import os
+import numpy as np
 from ddr5_power_tool.spec_parser import MemorySpec, MemoryPowerSpec, MemoryTimingSpec, ArchitectureSpec
-from ddr5_power_tool.workload_parser import Workload, Command, CommandType
+from ddr5_power_tool.workload_parser import Workload, WorkloadArrays, Command, CommandType, CMD_CODE
 from ddr5_power_tool.simulator import Simulator
+from ddr5_power_tool._njit import HAVE_NUMBA
+
+
+def cycles_to_ns(cycles: np.ndarray, tck: float) -> np.ndarray:
+    """Convert clock-cycle timestamps to nanoseconds in one vectorized multiply."""
+    return np.asarray(cycles).astype(np.float64) * tck
 
 
 class TestSimulator(unittest.TestCase):
     """Test simulator."""
     
-    def setUp(self):
-        """Set up test fixtures."""
+    @classmethod
+    def setUpClass(cls):
+        """Set up the shared (read-only) memory specification."""
         power_spec = MemoryPowerSpec(
             idd0=51.0, idd2n=35.0, idd2p=25.0, idd3n=46.0, idd3p=15.0,
             idd4r=146.0, idd4w=120.0, idd5b=80.0, idd6=3.0,
@@ -27,7 +36,12 @@ class TestSimulator(unittest.TestCase):
             nbr_of_rows=65536, width=64, burst_length=16, density=16
         )
         
-        self.spec = MemorySpec(power=power_spec, timing=timing_spec, architecture=arch_spec)
+        cls.spec = MemorySpec(power=power_spec, timing=timing_spec, architecture=arch_spec)
+    
+    def assert_positive(self, result, *names):
+        """Assert that the named result fields are all positive, in one comparison."""
+        self.assertEqual({name: getattr(result, name) > 0 for name in names},
+                         dict.fromkeys(names, True), result)
     
     def test_simple_workload(self):
         """Test simple workload simulation."""
@@ -42,25 +56,64 @@ class TestSimulator(unittest.TestCase):
         simulator = Simulator(self.spec)
         result = simulator.simulate(workload)
         
-        # Should have positive energy
-        self.assertGreater(result.total_energy, 0)
-        self.assertGreater(result.average_power, 0)
-        self.assertGreater(result.simulation_time, 0)
+        # Should have positive energy, including activation and read energy
+        self.assert_positive(result, "total_energy", "average_power", "simulation_time",
+                             "activation_energy", "read_energy")
+        
+        # Struct-of-arrays columns simulate to the same result
+        arrays = WorkloadArrays.from_commands(commands)
+        self.assertEqual(arrays.code.tolist(), [cmd.code for cmd in commands])
+        self.assertEqual(Simulator(self.spec).simulate(arrays), result)
+    
+    def test_workload_edits_are_simulated(self):
+        """Test that commands appended after a simulation are seen by the next one."""
+        commands = [
+            Command(timestamp=0, command=CommandType.ACT, bank=0, rank=0, row=512),
+            Command(timestamp=150, command=CommandType.PRE, bank=0, rank=0),
+        ]
+        workload = Workload(commands=commands, metadata=None)
+        first = Simulator(self.spec).simulate(workload)
         
-        # Should have activation and read energy
-        self.assertGreater(result.activation_energy, 0)
-        self.assertGreater(result.read_energy, 0)
+        workload.commands.append(Command(timestamp=300, command=CommandType.ACT, bank=1, rank=0, row=64))
+        second = Simulator(self.spec).simulate(workload)
+        self.assertGreater(second.activation_energy, first.activation_energy)
+    
+    def test_fractional_timestamps(self):
+        """Test that fractional cycle timestamps are not truncated."""
+        commands = [
+            Command(timestamp=0, command=CommandType.ACT, bank=0, rank=0, row=512),
+            Command(timestamp=150, command=CommandType.PRE, bank=0, rank=0),
+            Command(timestamp=1000.9, command=CommandType.END_OF_SIMULATION)
+        ]
+        result = Simulator(self.spec).simulate(Workload(commands=commands, metadata=None))
+        self.assertAlmostEqual(result.simulation_time, 1000.9 * self.spec.timing.tck)
+    
+    def test_error_timestamps(self):
+        """Test that errors report timestamps as given in the workload."""
+        for pre in (10, 10.0, 10.5):
+            commands = [
+                Command(timestamp=0, command=CommandType.ACT, bank=0, rank=0, row=512),
+                Command(timestamp=pre, command=CommandType.PRE, bank=0, rank=0),  # tRAS violation
+                Command(timestamp=1000, command=CommandType.END_OF_SIMULATION)
+            ]
+            for use_jit in (True, False):
+                with self.subTest(pre=pre, use_jit=use_jit):
+                    simulator = Simulator(self.spec, use_jit=use_jit)
+                    simulator.simulate(Workload(commands=commands, metadata=None))
+                    self.assertIn(f"Command PRE at {pre} cycles:", simulator.get_errors()[0])
     
     def test_timing_violation_detection(self):
         """Test that timing violations are detected."""
-        # Convert timestamps to account for tCK
-        tck_cycles = 0.312  # ns per cycle
-        # ACT at cycle 0 = 0 ns
-        # PRE at cycle 10 = 10 * 0.312 = 3.12 ns (less than tRAS = 32 ns)
+        # PRE at cycle 10 (3.12 ns) is well before tRAS (32 ns)
+        cycles = np.array([0, 10, 1000])
+        times_ns = cycles_to_ns(cycles, self.spec.timing.tck)
+        self.assertLess(times_ns[1] - times_ns[0], self.spec.timing.tras)
+        
+        act, pre, end = cycles.tolist()
         commands = [
-            Command(timestamp=0, command=CommandType.ACT, bank=0, rank=0, row=512),
-            Command(timestamp=10, command=CommandType.PRE, bank=0, rank=0),  # Too early (tRAS violation)
-            Command(timestamp=1000, command=CommandType.END_OF_SIMULATION)
+            Command(timestamp=act, command=CommandType.ACT, bank=0, rank=0, row=512),
+            Command(timestamp=pre, command=CommandType.PRE, bank=0, rank=0),  # Too early (tRAS violation)
+            Command(timestamp=end, command=CommandType.END_OF_SIMULATION)
         ]
         
         from ddr5_power_tool.workload_parser import WorkloadMetadata
@@ -73,6 +126,36 @@ class TestSimulator(unittest.TestCase):
         self.assertGreater(len(errors), 0, f"Expected timing violation errors, got: {errors}")
         self.assertTrue(any("tras" in error.lower() for error in errors), f"Expected tRAS violation in errors: {errors}")
     
+    def test_unknown_bank(self):
+        """Test that a command to a bank outside the spec raises on both paths."""
+        # PREA looks up bank 0 of the rank, whatever its bank field
+        for command, rank, bank, key in ((CommandType.ACT, 0, 19, (0, 19)),
+                                         (CommandType.PREA, 2, 3, (2, 0))):
+            commands = [
+                Command(timestamp=0, command=command, bank=bank, rank=rank, row=512),
+                Command(timestamp=1000, command=CommandType.END_OF_SIMULATION)
+            ]
+            arrays = WorkloadArrays.from_commands(commands)
+            for use_jit in (True, False):
+                with self.subTest(command=command, use_jit=use_jit):
+                    with self.assertRaises(KeyError) as ctx:
+                        Simulator(self.spec, use_jit=use_jit).simulate(arrays)
+                    self.assertEqual(ctx.exception.args[0], key)
+    
+    def test_negative_bank(self):
+        """Test that negative ranks and banks raise KeyError rather than mapping to bank 0."""
+        for rank, bank, key in ((0, -2, (0, -2)), (-1, None, (-1, 0)), (0, -1, (0, -1))):
+            commands = [
+                Command(timestamp=0, command=CommandType.ACT, bank=bank, rank=rank, row=512),
+                Command(timestamp=1000, command=CommandType.END_OF_SIMULATION)
+            ]
+            for use_jit in (True, False):
+                with self.subTest(rank=rank, bank=bank, use_jit=use_jit):
+                    with self.assertRaises(KeyError) as ctx:
+                        Simulator(self.spec, use_jit=use_jit).simulate(
+                            Workload(commands=commands, metadata=None))
+                    self.assertEqual(ctx.exception.args[0], key)
+    
     def test_refresh_command(self):
         """Test refresh command handling."""
         commands = [
@@ -87,6 +170,63 @@ class TestSimulator(unittest.TestCase):
         
         # Should have refresh energy
         self.assertGreater(result.refresh_energy, 0)
+    
+    def test_background_power(self):
+        """Test background power across reads that do not change bank state."""
+        commands = [
+            Command(timestamp=0, command=CommandType.ACT, bank=0, rank=0, row=512),
+            Command(timestamp=50, command=CommandType.RD, bank=0, rank=0),
+            Command(timestamp=60, command=CommandType.RD, bank=0, rank=0),
+            Command(timestamp=70, command=CommandType.WR, bank=0, rank=0),
+            Command(timestamp=150, command=CommandType.PRE, bank=0, rank=0),
+            Command(timestamp=1000, command=CommandType.END_OF_SIMULATION)
+        ]
+        
+        from ddr5_power_tool.workload_parser import WorkloadMetadata
+        workload = Workload(commands=commands, metadata=WorkloadMetadata())
+        simulator = Simulator(self.spec)
+        result = simulator.simulate(workload)
+        
+        # One of four banks is active from ACT to PRE, all idle afterwards
+        pre_ns, end_ns = cycles_to_ns([150, 1000], self.spec.timing.tck)
+        active_ns = pre_ns
+        idle_ns = end_ns - active_ns
+        expected_active = 46.0 * 1.1 * (active_ns / 4) / 1000.0
+        expected_precharge = 35.0 * 1.1 * (active_ns * 3 / 4 + idle_ns) / 1000.0
+        self.assertAlmostEqual(result.background_active_energy, expected_active, places=9)
+        self.assertAlmostEqual(result.background_precharge_energy, expected_precharge, places=9)
+    
+    @unittest.skipUnless(HAVE_NUMBA, "Numba is not installed")
+    def test_large_workload_numba(self):
+        """Test that the JIT trace kernel matches the per-command loop on a large trace."""
+        n_triples = 10**5
+        start = np.arange(n_triples, dtype=np.int64) * 200  # 62.4 ns apart, beyond tRC
+        offsets = np.array([0, 50, 150])
+        act, rd, pre = (CMD_CODE[c] for c in (CommandType.ACT, CommandType.RD, CommandType.PRE))
+        
+        n = 3 * n_triples
+        banks = np.repeat(np.arange(n_triples) % 4, 3).astype(np.int16)
+        arrays = WorkloadArrays(
+            timestamp=(start[:, None] + offsets).ravel(),
+            code=np.tile(np.array([act, rd, pre], dtype=np.int8), n_triples),
+            rank=np.zeros(n, dtype=np.int16),
+            bank=banks,
+            row=np.tile(np.array([512, -1, -1], dtype=np.int32), n_triples),
+            column=np.full(n, -1, dtype=np.int32),
+            burst_length=np.full(n, -1, dtype=np.int16),
+        )
+        
+        jit_sim = Simulator(self.spec, use_jit=True)
+        loop_sim = Simulator(self.spec, use_jit=False)
+        jit_result = jit_sim.simulate(arrays)
+        loop_result = loop_sim.simulate(arrays)
+        
+        self.assertEqual(jit_sim.get_errors(), [])
+        self.assertEqual(loop_sim.get_errors(), [])
+        for name in ("total_energy", "activation_energy", "read_energy", "precharge_energy",
+                     "background_active_energy", "background_precharge_energy"):
+            self.assertTrue(math.isclose(getattr(jit_result, name), getattr(loop_result, name),
+                                         rel_tol=1e-9), name)
 
 
 if __name__ == '__main__':
@@ -1,10 +1,55 @@
 """Tests for specification parser."""
 
 import unittest
-import json
 import tempfile
 import os
 from ddr5_power_tool.spec_parser import MemorySpec, MemoryPowerSpec, MemoryTimingSpec, ArchitectureSpec
+from ddr5_power_tool._compat import dump_json
+
+
+SPEC_DATA = {
+    "mempowerspec": {
+        "idd0": 51.0,
+        "idd2n": 35.0,
+        "idd2p": 25.0,
+        "idd3n": 46.0,
+        "idd3p": 15.0,
+        "idd4r": 146.0,
+        "idd4w": 120.0,
+        "idd5b": 80.0,
+        "idd6": 3.0,
+        "vdd": 1.1,
+        "vddq": 1.1,
+        "vddca": 1.1
+    },
+    "memtimingspec": {
+        "tck": 0.312,
+        "tras": 32.0,
+        "trp": 13.75,
+        "trcd": 13.75,
+        "trfc": 280.0
+    },
+    "architecture": {
+        "nbrOfRanks": 1,
+        "nbrOfBanks": 16,
+        "nbrOfColumns": 1024,
+        "nbrOfRows": 65536,
+        "width": 64,
+        "burstLength": 16,
+        "density": 16
+    }
+}
+
+
+def setUpModule():
+    """Create one temporary directory for the module's JSON files."""
+    global _TMPDIR
+    _TMPDIR = tempfile.TemporaryDirectory()
+
+
+def tearDownModule():
+    """Remove the module's temporary directory."""
+    _TMPDIR.cleanup()
 
 
 class TestSpecParser(unittest.TestCase):
@@ -42,53 +87,25 @@ class TestSpecParser(unittest.TestCase):
         
         self.assertEqual(timing.trc, 45.75)  # tras + trp
     
+    def test_from_dict(self):
+        """Test building a spec from a parsed JSON dictionary."""
+        spec = MemorySpec.from_dict(SPEC_DATA)
+        
+        self.assertEqual(spec.power.idd0, 51.0)
+        self.assertEqual(spec.timing.tck, 0.312)
+        self.assertEqual(spec.architecture.nbr_of_banks, 16)
+    
     def test_load_from_json(self):
         """Test loading spec from JSON file."""
-        spec_data = {
-            "mempowerspec": {
-                "idd0": 51.0,
-                "idd2n": 35.0,
-                "idd2p": 25.0,
-                "idd3n": 46.0,
-                "idd3p": 15.0,
-                "idd4r": 146.0,
-                "idd4w": 120.0,
-                "idd5b": 80.0,
-                "idd6": 3.0,
-                "vdd": 1.1,
-                "vddq": 1.1,
-                "vddca": 1.1
-            },
-            "memtimingspec": {
-                "tck": 0.312,
-                "tras": 32.0,
-                "trp": 13.75,
-                "trcd": 13.75,
-                "trfc": 280.0
-            },
-            "architecture": {
-                "nbrOfRanks": 1,
-                "nbrOfBanks": 16,
-                "nbrOfColumns": 1024,
-                "nbrOfRows": 65536,
-                "width": 64,
-                "burstLength": 16,
-                "density": 16
-            }
-        }
+        temp_path = os.path.join(_TMPDIR.name, "spec.json")
+        dump_json(SPEC_DATA, temp_path)
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(spec_data, f)
-            temp_path = f.name
+        spec = MemorySpec.from_json(temp_path)
+        self.assertEqual(spec, MemorySpec.from_dict(SPEC_DATA))
         
-        try:
-            spec = MemorySpec.from_json(temp_path)
-            
-            self.assertEqual(spec.power.idd0, 51.0)
-            self.assertEqual(spec.timing.tck, 0.312)
-            self.assertEqual(spec.architecture.nbr_of_banks, 16)
-        finally:
-            os.unlink(temp_path)
+        # Each load returns its own spec, unaffected by edits to earlier ones
+        spec.architecture.nbr_of_banks = 4
+        self.assertEqual(MemorySpec.from_json(temp_path).architecture.nbr_of_banks, 16)
 
 
 if __name__ == '__main__':
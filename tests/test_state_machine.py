@@ -1,15 +1,51 @@
 """Tests for state machine."""
 
 import unittest
+import numpy as np
 from ddr5_power_tool.spec_parser import MemorySpec, MemoryPowerSpec, MemoryTimingSpec, ArchitectureSpec
 from ddr5_power_tool.state_machine import DRAMStateMachine, BankState
+from ddr5_power_tool.workload_parser import CommandType, CMD_CODE
+
+
+def _activate(sm):
+    return sm.execute_activate(0, 0, 512)
+
+
+def _read(sm):
+    return sm.execute_read(0, 0)
+
+
+def _write(sm):
+    return sm.execute_write(0, 0)
+
+
+def _precharge(sm):
+    return sm.execute_precharge(0, 0)
+
+
+def _refresh(sm):
+    return sm.execute_refresh()
+
+
+# (constraint, prelude [(time ns, command)], probed command, too-early ns, allowed ns,
+#  bank 0 state once the probe succeeds)
+# for the test spec: tRCD 13.75, tRAS 32, tRC 45.75, tWR 15, tREFI 7800 ns
+# (tRC is only checked once a bank has an ACTIVATE after time 0)
+TIMING_CONSTRAINTS = [
+    ("trcd", [(0.0, _activate)], _read, 5.0, 15.0, BankState.ACTIVE),
+    ("tras", [(0.0, _activate)], _precharge, 20.0, 35.0, BankState.IDLE),
+    ("trc", [(10.0, _activate), (45.0, _precharge)], _activate, 50.0, 60.0, BankState.ACTIVE),
+    ("twr", [(0.0, _activate), (30.0, _write)], _precharge, 35.0, 50.0, BankState.IDLE),
+    ("trefi", [(0.0, _refresh)], _refresh, 100.0, 8000.0, BankState.IDLE),
+]
 
 
 class TestStateMachine(unittest.TestCase):
     """Test DRAM state machine."""
     
-    def setUp(self):
-        """Set up test fixtures."""
+    @classmethod
+    def setUpClass(cls):
+        """Set up the shared memory specification and state machine (reset by setUp)."""
         power_spec = MemoryPowerSpec(
             idd0=51.0, idd2n=35.0, idd2p=25.0, idd3n=46.0, idd3p=15.0,
             idd4r=146.0, idd4w=120.0, idd5b=80.0, idd6=3.0,
@@ -25,8 +61,12 @@ class TestStateMachine(unittest.TestCase):
             nbr_of_rows=65536, width=64, burst_length=16, density=16
         )
         
-        self.spec = MemorySpec(power=power_spec, timing=timing_spec, architecture=arch_spec)
-        self.state_machine = DRAMStateMachine(self.spec)
+        cls.spec = MemorySpec(power=power_spec, timing=timing_spec, architecture=arch_spec)
+        cls.state_machine = DRAMStateMachine(cls.spec)
+
+    def setUp(self):
+        """Start each test from the initial (all IDLE) state."""
+        self.state_machine.reset()
     
     def test_initial_state(self):
         """Test initial bank states."""
@@ -34,16 +74,62 @@ class TestStateMachine(unittest.TestCase):
         self.assertEqual(bank_info.state, BankState.IDLE)
         self.assertIsNone(bank_info.open_row)
     
+    def test_reset(self):
+        """Test that reset matches a freshly constructed state machine."""
+        state_row = self.state_machine.state_row
+        self.state_machine.update_time(0.0)
+        self.state_machine.execute_activate(0, 1, 512)
+        self.state_machine.update_time(20.0)
+        self.state_machine.execute_write(0, 1)
+        self.state_machine.execute_refresh()
+        self.state_machine.reset()
+        
+        fresh = DRAMStateMachine(self.spec)
+        self.assertIs(self.state_machine.state_row, state_row)
+        for name in ("state_row", "last_activate_time", "last_precharge_time",
+                     "last_read_time", "last_write_time", "last_powerdown_time"):
+            np.testing.assert_array_equal(getattr(self.state_machine, name), getattr(fresh, name))
+        self.assertEqual(self.state_machine.active_count, 0)
+        self.assertEqual(self.state_machine.last_refresh_time, fresh.last_refresh_time)
+        self.assertEqual(self.state_machine.current_time, fresh.current_time)
+    
     def test_activate(self):
         """Test ACTIVATE command."""
+        bank_info = self.state_machine.get_bank_info(0, 0)
         self.state_machine.update_time(0.0)
         success, error = self.state_machine.execute_activate(0, 0, 512)
         
+        # Bank info is a live view of the state machine
         self.assertTrue(success)
-        bank_info = self.state_machine.get_bank_info(0, 0)
         self.assertEqual(bank_info.state, BankState.ACTIVE)
         self.assertEqual(bank_info.open_row, 512)
     
+    def test_large_row(self):
+        """Test that rows beyond 29 bits are stored without overflow or wrapping."""
+        row = 2**30 + 5
+        self.state_machine.update_time(0.0)
+        self.assertTrue(self.state_machine.execute_activate(0, 0, row)[0])
+        self.assertEqual(self.state_machine.get_bank_info(0, 0).open_row, row)
+        
+        act = CMD_CODE[CommandType.ACT]
+        self.state_machine.run_trace(
+            np.array([act]), np.array([10.0]), np.zeros(1, dtype=np.int64),
+            np.array([1]), np.array([2**31 - 1], dtype=np.int32), 20.0
+        )
+        self.assertEqual(self.state_machine.get_bank_info(0, 1).open_row, 2**31 - 1)
+    
+    def test_unknown_bank(self):
+        """Test that commands to a bank outside the spec raise KeyError."""
+        self.state_machine.update_time(0.0)
+        with self.assertRaises(KeyError):
+            self.state_machine.execute_activate(0, 4, 512)
+        with self.assertRaises(KeyError):
+            self.state_machine.execute_read(1, 0)
+        with self.assertRaises(KeyError):
+            self.state_machine.execute_precharge_all(1)
+        with self.assertRaises(KeyError):
+            self.state_machine.get_bank_info(0, -1)
+    
     def test_read_requires_active(self):
         """Test that READ requires active bank."""
         self.state_machine.update_time(0.0)
@@ -52,39 +138,131 @@ class TestStateMachine(unittest.TestCase):
         self.assertFalse(success)
         self.assertIn("active", error.lower())
     
-    def test_read_after_activate(self):
-        """Test READ after ACTIVATE with tRCD constraint."""
+    def test_all_timing_constraints(self):
+        """Test each timing constraint just before and just after its window."""
+        for name, prelude, probe, early_ns, late_ns, final_state in TIMING_CONSTRAINTS:
+            with self.subTest(constraint=name):
+                state_machine = self.state_machine
+                state_machine.reset()
+                for time_ns, command in prelude:
+                    state_machine.update_time(time_ns)
+                    self.assertTrue(command(state_machine)[0])
+                
+                # Too early: rejected with the constraint named in the error
+                state_machine.update_time(early_ns)
+                success, error = probe(state_machine)
+                self.assertFalse(success)
+                self.assertIn(name, error.lower())
+                
+                # After the constraint has elapsed
+                state_machine.update_time(late_ns)
+                success, error = probe(state_machine)
+                self.assertTrue(success, error)
+                self.assertEqual(state_machine.get_bank_info(0, 0).state, final_state)
+    
+    def test_state_array_tracks_banks(self):
+        """Test that the state array mirrors per-bank states."""
+        self.state_machine.update_time(0.0)
+        self.state_machine.execute_activate(0, 1, 512)
+        self.assertEqual(self.state_machine.state_arr[0, 1], BankState.ACTIVE)
+        self.assertEqual(self.state_machine.state_arr[0, 0], BankState.IDLE)
+        
+        self.state_machine.update_time(35.0)
+        self.state_machine.execute_precharge(0, 1)
+        self.assertEqual(self.state_machine.state_arr[0, 1], BankState.IDLE)
+        
+        # Decoded arrays are snapshots and reject writes
+        with self.assertRaises(ValueError):
+            self.state_machine.state_arr[0, 1] = BankState.ACTIVE
+        with self.assertRaises(ValueError):
+            self.state_machine.open_row[0] = 512
+    
+    def test_precharge_all(self):
+        """Test PRECHARGE ALL closes open banks and reports idle banks."""
         self.state_machine.update_time(0.0)
         self.state_machine.execute_activate(0, 0, 512)
+        self.state_machine.execute_activate(0, 2, 256)
         
-        # Try read too early (before tRCD)
-        self.state_machine.update_time(5.0)  # Less than tRCD (13.75 ns)
-        success, error = self.state_machine.execute_read(0, 0)
+        self.state_machine.update_time(35.0)
+        success, error = self.state_machine.execute_precharge_all(0)
+        
+        # Banks 1 and 3 were already idle
         self.assertFalse(success)
-        self.assertIn("trcd", error.lower())
+        self.assertIn("idle", error.lower())
+        for bank in range(4):
+            self.assertEqual(self.state_machine.get_bank_info(0, bank).state, BankState.IDLE)
+    
+    def test_refresh_closes_active_banks(self):
+        """Test that REFRESH returns open banks to IDLE."""
+        self.state_machine.update_time(0.0)
+        self.state_machine.execute_activate(0, 1, 512)
+        success, _ = self.state_machine.execute_refresh()
         
-        # Try read after tRCD
-        self.state_machine.update_time(15.0)  # After tRCD
-        success, error = self.state_machine.execute_read(0, 0)
         self.assertTrue(success)
+        bank_info = self.state_machine.get_bank_info(0, 1)
+        self.assertEqual(bank_info.state, BankState.IDLE)
+        self.assertIsNone(bank_info.open_row)
     
-    def test_precharge_requires_tras(self):
-        """Test that PRECHARGE requires tRAS."""
+    def test_read_only_hint_keeps_twr(self):
+        """Test that a WRITE after a read-only hint restores the tWR check."""
+        self.state_machine.set_read_only(True)
         self.state_machine.update_time(0.0)
         self.state_machine.execute_activate(0, 0, 512)
+        self.state_machine.update_time(30.0)
+        self.state_machine.execute_write(0, 0)
         
-        # Try precharge too early (before tRAS)
-        self.state_machine.update_time(20.0)  # Less than tRAS (32 ns)
+        self.state_machine.update_time(35.0)  # After tRAS, within tWR (15 ns)
         success, error = self.state_machine.execute_precharge(0, 0)
         self.assertFalse(success)
-        self.assertIn("tras", error.lower())
+        self.assertIn("twr", error.lower())
+    
+    def test_active_and_idle_banks(self):
+        """Test listing banks by state."""
+        self.state_machine.update_time(0.0)
+        self.state_machine.execute_activate(0, 1, 512)
+        self.state_machine.execute_activate(0, 3, 256)
         
-        # Try precharge after tRAS
-        self.state_machine.update_time(35.0)  # After tRAS
-        success, error = self.state_machine.execute_precharge(0, 0)
-        self.assertTrue(success)
-        bank_info = self.state_machine.get_bank_info(0, 0)
-        self.assertEqual(bank_info.state, BankState.IDLE)
+        self.assertEqual(self.state_machine.get_active_banks(), [(0, 1), (0, 3)])
+        self.assertEqual(self.state_machine.active_count, 2)
+        self.assertEqual(self.state_machine.get_idle_banks(), [(0, 0), (0, 2)])
+    
+    def test_constraint_result_codes(self):
+        """Test that constraint checks return 0 on success and an error code otherwise."""
+        constraints = self.state_machine.constraints
+        active = BankState.ACTIVE
+        self.assertEqual(constraints.can_read(active, 0.0, 15.0), 0)
+        
+        code = constraints.can_read(active, 0.0, 5.0)
+        self.assertNotEqual(code, 0)
+        self.assertIn("trcd", constraints.error_message(code, 5.0).lower())
+    
+    def test_constraint_kernel_state_codes(self):
+        """Test that the constraint kernels agree with BankState."""
+        from ddr5_power_tool import _constraints_njit
+        self.assertEqual(_constraints_njit._IDLE, BankState.IDLE)
+        self.assertEqual(_constraints_njit._ACTIVE, BankState.ACTIVE)
+        self.assertEqual(_constraints_njit._REFRESHING, BankState.REFRESHING)
+    
+    def test_run_trace(self):
+        """Test executing a command sequence in one batch."""
+        act, rd, pre = (CMD_CODE[c] for c in (CommandType.ACT, CommandType.RD, CommandType.PRE))
+        codes = np.array([act, rd, rd, pre])
+        times_ns = np.array([0.0, 5.0, 15.0, 35.0])
+        results, values, state_time_ns = self.state_machine.run_trace(
+            codes, times_ns, np.zeros(4, dtype=np.int64),
+            np.zeros(4, dtype=np.int64), np.array([512, -1, -1, -1]), 100.0
+        )
+        
+        # Only the early read fails (tRCD)
+        self.assertEqual(list(results != 0), [False, True, False, False])
+        self.assertIn("trcd", self.state_machine.constraints.error_message(
+            int(results[1]), float(values[1])).lower())
+        self.assertEqual(self.state_machine.get_bank_info(0, 0).state, BankState.IDLE)
+        self.assertEqual(self.state_machine.active_count, 0)
+        
+        # One bank active from ACT to PRE; four banks idle otherwise
+        self.assertAlmostEqual(state_time_ns[BankState.ACTIVE], 35.0)
+        self.assertAlmostEqual(state_time_ns[BankState.IDLE], 3 * 35.0 + 4 * 65.0)
 
 
 if __name__ == '__main__':
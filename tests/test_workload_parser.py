@@ -1,10 +1,49 @@
 """Tests for workload parser."""
 
 import unittest
-import json
 import tempfile
 import os
-from ddr5_power_tool.workload_parser import Workload, Command, CommandType, WorkloadMetadata
+from ddr5_power_tool.workload_parser import Workload, WorkloadArrays, Command, CommandType, WorkloadMetadata, CMD_CODE
+from ddr5_power_tool._compat import dump_json
+
+
+WORKLOAD_DATA = {
+    "commands": [
+        {
+            "timestamp": 0,
+            "command": "ACT",
+            "bank": 0,
+            "rank": 0,
+            "row": 512
+        },
+        {
+            "timestamp": 50,
+            "command": "RD",
+            "bank": 0,
+            "rank": 0,
+            "burstLength": 16
+        },
+        {
+            "timestamp": 5000,
+            "command": "END_OF_SIMULATION"
+        }
+    ],
+    "metadata": {
+        "dataRate": 6400,
+        "temperature": 50
+    }
+}
+
+
+def setUpModule():
+    """Create one temporary directory for the module's JSON files."""
+    global _TMPDIR
+    _TMPDIR = tempfile.TemporaryDirectory()
+
+
+def tearDownModule():
+    """Remove the module's temporary directory."""
+    _TMPDIR.cleanup()
 
 
 class TestWorkloadParser(unittest.TestCase):
@@ -27,47 +66,53 @@ class TestWorkloadParser(unittest.TestCase):
         self.assertEqual(cmd.bank, 0)
         self.assertEqual(cmd.row, 512)
     
+    def test_from_dict(self):
+        """Test building a workload from a parsed JSON dictionary."""
+        workload = Workload.from_dict(WORKLOAD_DATA)
+        
+        self.assertEqual(len(workload.commands), 3)
+        self.assertEqual(workload.commands[0].command, CommandType.ACT)
+        self.assertEqual(workload.metadata.data_rate, 6400)
+    
     def test_load_workload_from_json(self):
         """Test loading workload from JSON."""
-        workload_data = {
-            "commands": [
-                {
-                    "timestamp": 0,
-                    "command": "ACT",
-                    "bank": 0,
-                    "rank": 0,
-                    "row": 512
-                },
-                {
-                    "timestamp": 50,
-                    "command": "RD",
-                    "bank": 0,
-                    "rank": 0,
-                    "burstLength": 16
-                },
-                {
-                    "timestamp": 5000,
-                    "command": "END_OF_SIMULATION"
-                }
-            ],
-            "metadata": {
-                "dataRate": 6400,
-                "temperature": 50
-            }
-        }
+        temp_path = os.path.join(_TMPDIR.name, "workload.json")
+        dump_json(WORKLOAD_DATA, temp_path)
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(workload_data, f)
-            temp_path = f.name
+        workload = Workload.from_json(temp_path)
+        self.assertEqual(workload.commands, Workload.from_dict(WORKLOAD_DATA).commands)
         
-        try:
-            workload = Workload.from_json(temp_path)
-            
-            self.assertEqual(len(workload.commands), 3)
-            self.assertEqual(workload.commands[0].command, CommandType.ACT)
-            self.assertEqual(workload.metadata.data_rate, 6400)
-        finally:
-            os.unlink(temp_path)
+        # Each load returns its own command list
+        self.assertIsNot(Workload.from_json(temp_path).commands, workload.commands)
+        
+        # Struct-of-arrays loading gives the same commands
+        arrays = Workload.from_json_arrays(temp_path)
+        self.assertEqual(len(arrays), 3)
+        self.assertEqual(arrays.row.tolist(), [512, -1, -1])
+        self.assertEqual(arrays.to_commands(), workload.commands)
+    
+    def test_command_array(self):
+        """Test packing commands into a sorted structured array."""
+        commands = [
+            Command(timestamp=50, command=CommandType.RD, bank=1, rank=0, burst_length=16),
+            Command(timestamp=0, command=CommandType.ACT, bank=1, rank=0, row=512),
+            Command(timestamp=50, command=CommandType.PRE, bank=1, rank=0),
+        ]
+        
+        arr = Workload(commands=commands, metadata=WorkloadMetadata()).to_array()
+        
+        self.assertEqual(arr["timestamp"].tolist(), [0, 50, 50])
+        self.assertEqual(arr["code"].tolist(), [CMD_CODE[CommandType.ACT], CMD_CODE[CommandType.RD],
+                                                CMD_CODE[CommandType.PRE]])
+        self.assertEqual(arr["row"].tolist(), [512, -1, -1])
+        self.assertEqual(arr["burst_length"].tolist(), [-1, 16, -1])
+        
+        # Float timestamps stay floats, even whole ones
+        arrays = WorkloadArrays.from_dicts([{"timestamp": 100.0, "command": "REF"},
+                                            {"timestamp": 50, "command": "REF"}])
+        self.assertEqual([cmd.timestamp for cmd in arrays.to_commands()], [50.0, 100.0])
+        self.assertIsInstance(arrays.to_commands()[1].timestamp, float)
+        self.assertIsInstance(WorkloadArrays.from_commands(commands).to_commands()[0].timestamp, int)
     
     def test_invalid_command(self):
         """Test handling invalid command type."""
@@ -79,6 +124,16 @@ class TestWorkloadParser(unittest.TestCase):
         
         with self.assertRaises(ValueError):
             Command.from_dict(cmd_dict)
+        
+        # Bulk packing into columns rejects it the same way
+        with self.assertRaises(ValueError):
+            WorkloadArrays.from_dicts([cmd_dict])
+        
+        # Negative addresses are rejected rather than read as missing fields
+        with self.assertRaises(KeyError):
+            WorkloadArrays.from_dicts([{"timestamp": 0, "command": "RD", "bank": -1}])
+        with self.assertRaises(ValueError):
+            WorkloadArrays.from_dicts([{"timestamp": 0, "command": "ACT", "bank": 0, "row": -5}])
 
 
 if __name__ == '__main__':